@@ -12,7 +12,7 @@ def get_mask(n_bits: int) -> int:
     Returns:
         int: integer mask
     """
-    return max(1, 2**n_bits) - 1
+    return (1 << n_bits) - 1
 
 
 def split(n: int, shift: int) -> Tuple[int, int]:
@@ -20,10 +20,14 @@ def split(n: int, shift: int) -> Tuple[int, int]:
 
     Args:
         n (int): integer to split
-        shift (int): bit shift count to split the integer
+        shift (int): bit shift count to split the integer, must not be negative
+
+    Raises:
+        ValueError: if the shift count is negative
 
     Returns:
         Tuple[int, int]: most significant bit integer / least significant bit integer
     """
-    shift = min(8, max(0, shift))
-    return n >> shift, n & get_mask(shift)
+    if shift < 0:
+        raise ValueError(f"Negative shift count {shift}")
+    return n >> shift, n & ((1 << shift) - 1)
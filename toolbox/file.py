@@ -1,7 +1,7 @@
 """File related utils."""
 
 import os
-from typing import Iterator
+from typing import Iterator, List
 
 from toolbox.logger import console_err
 
@@ -11,6 +11,18 @@ def iter_files(path: str) -> Iterator[str]:
         console_err.log(f"Path '{path}' does not exist")
         return
     
-    for root, _, files in os.walk(path):
-        for file in files:
-            yield os.path.join(root, file)
\ No newline at end of file
+    # Depth first walk, using the cached DirEntry type info to avoid extra stat calls.
+    stack: List[str] = [path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            # Same as os.walk, skip directories that can't be listed.
+            continue
+        with entries:
+            for entry in entries:
+                if not entry.is_dir():
+                    yield entry.path
+                elif not entry.is_symlink():
+                    # Like os.walk, symlinked directories are neither files nor followed.
+                    stack.append(entry.path)
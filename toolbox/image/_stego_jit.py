@@ -0,0 +1,82 @@
+"""Numba kernels splitting payload bytes into, and reassembling them from, channel LSBs."""
+
+import numpy as np
+from numba import njit, prange, types
+
+# Note: payloads usually come from `np.frombuffer(bytes)`, which numba types as a readonly array.
+_U8_RO = types.Array(types.uint8, 1, "C", readonly=True)
+_U8 = types.Array(types.uint8, 1, "C")
+_U8_2D = types.Array(types.uint8, 2, "C")
+
+
+@njit(_U8_2D(_U8_RO, types.int64, types.int64, _U8), cache=True, boundscheck=False, nogil=True)
+def pack_bits(data, lsb, shift, msb_mask_table):
+    """Split `data` into `lsb` sized chunks, equivalent to `Cursor.iter_bits`.
+
+    Args:
+        data: payload bytes
+        lsb: number of bits stored per channel
+        shift: number of bits already occupied in the first channel
+        msb_mask_table: `Cursor.get_msb_mask(n)` for every `n` in `[0, lsb]`
+
+    Returns:
+        (N, 2) array holding the chunk value and the mask of bits to preserve for each channel
+    """
+    total = len(data) * 8 + shift
+    out = np.empty(((total + lsb - 1) // lsb, 2), dtype=np.uint8)
+    q = 0
+    first_shift = shift
+    k = 0
+
+    for i in range(len(data)):
+        shift += 8
+        q = (q << 8) | int(data[i])
+        while shift >= lsb:
+            shift -= lsb
+            out[k, 0] = q >> shift
+            q &= (1 << shift) - 1
+            out[k, 1] = msb_mask_table[min(lsb, max(0, first_shift))]
+            first_shift -= lsb
+            k += 1
+
+    if shift:
+        offset = lsb - shift
+        out[k, 0] = q << offset
+        out[k, 1] = (1 << offset) - 1
+    return out
+
+
+@njit(types.void(_U8_RO, types.int64, _U8, types.int64), cache=True, boundscheck=False, nogil=True, parallel=True)
+def pack_lsb(data, lsb, array, idx):
+    """Write `data` into the low `lsb` bits of `array[idx:]`, in parallel.
+
+    Only valid when `lsb` divides 8, each byte then spans exactly `8 // lsb` channels. The caller
+    must make sure `array` holds enough channels.
+    """
+    per_byte = 8 // lsb
+    lsb_mask = (1 << lsb) - 1
+    msb_mask = 0xFF ^ lsb_mask
+    for i in prange(len(data)):
+        byte = int(data[i])
+        base = idx + i * per_byte
+        for j in range(per_byte):
+            shift = 8 - lsb * (j + 1)
+            array[base + j] = (array[base + j] & msb_mask) | ((byte >> shift) & lsb_mask)
+
+
+@njit(_U8(_U8_RO, types.int64, types.int64, types.int64), cache=True, boundscheck=False, nogil=True, parallel=True)
+def unpack_lsb(array, lsb, count, idx):
+    """Read `count` bytes from the low `lsb` bits of `array[idx:]`, in parallel.
+
+    The inverse of `pack_lsb`, with the same constraints.
+    """
+    per_byte = 8 // lsb
+    lsb_mask = (1 << int(lsb)) - 1
+    out = np.empty(count, dtype=np.uint8)
+    for i in prange(count):
+        base = idx + i * per_byte
+        byte = 0
+        for j in range(per_byte):
+            byte = (byte << lsb) | (int(array[base + j]) & lsb_mask)
+        out[i] = byte
+    return out
@@ -1,5 +1,7 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import glob
 import os
+from typing import Iterator, List, Set
 from PIL import Image
 from rich.progress import track
 
@@ -16,11 +18,23 @@ def extract_images_from_gif(gif_file: str, out_folder: str="out") -> bool:
     try:
         out_folder = os.path.abspath(out_folder)
         os.makedirs(out_folder, exist_ok=True)
-        with Image.open(gif_file) as im:
+        # PNG encoding releases the GIL, so frames are saved on a thread pool while the next
+        # frames are decoded.
+        workers = os.cpu_count() or 1
+        with Image.open(gif_file) as im, ThreadPoolExecutor(max_workers=workers) as executor:
+            pending: Set[Future[None]] = set()
             for i in track(range(im.n_frames), description="Extracting frames"):
                 im.seek(i)
                 frame_filename = os.path.join(out_folder, f"frame_{i:04d}.png")
-                im.save(frame_filename)
+                # Note: seeking reuses the decoder's frame buffer, so save a copy of the frame.
+                pending.add(executor.submit(im.copy().save, frame_filename))
+                if len(pending) >= workers * 2:
+                    # Limit the number of decoded frames waiting in memory.
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+            for future in pending:
+                future.result()
             console.log(f"Wrote [green]{im.n_frames}[/green] images to [green]{out_folder}[/green]")
         return True
         
@@ -30,6 +44,13 @@ def extract_images_from_gif(gif_file: str, out_folder: str="out") -> bool:
         console_err.log(f"An error occurred: {e}", style="red")
     return False
         
+def iter_frames(image_paths: List[str]) -> Iterator[Image.Image]:
+    """Open image frames one at a time, closing each once the consumer moves on to the next."""
+    for path in image_paths:
+        with Image.open(path) as frame:
+            yield frame
+
+
 def write_gif_from_frames(image_folder: str, out_file: str, duration: int=100) -> bool:
     """
     Creates an animated GIF from image frames in a specified folder.
@@ -46,18 +67,16 @@ def write_gif_from_frames(image_folder: str, out_file: str, duration: int=100) -
         console_err.log(f"No images found in {image_folder}", style="red")
         return False
 
-    # Open all image frames
-    images = [Image.open(path) for path in image_paths]
-    
     out_file = os.path.abspath(out_file)
 
     # Save as GIF
-    # The first image is saved, and subsequent images are appended
-    with console.status(f"Writing image [green]{out_file}[/green]"):
-        images[0].save(
+    # The first image is saved, and subsequent images are appended, opening each frame only when
+    # the encoder asks for it rather than holding every frame file open at once.
+    with console.status(f"Writing image [green]{out_file}[/green]"), Image.open(image_paths[0]) as first:
+        first.save(
             out_file,
             save_all=True,
-            append_images=images[1:],
+            append_images=iter_frames(image_paths[1:]),
             duration=duration,
             loop=0
         )
@@ -1,15 +1,13 @@
 # pylint: disable=too-many-instance-attributes
 #!/usr/bin/env python3
 
+from collections import deque
 from dataclasses import dataclass
 from hashlib import sha256
 import sys
 from typing import (
-    Any,
-    Callable,
+    Deque,
     Iterator,
-    List,
-    Literal,
     Tuple,
     Union,
     Optional,
@@ -17,17 +15,19 @@ from typing import (
 import os
 from random import randbytes
 from contextlib import contextmanager
+from itertools import islice
+from types import ModuleType
 from PIL import Image
 
 from numpy.typing import NDArray
 import numpy as np
 from rich.table import Table, Column
-from rich.progress import track
 from rich.emoji import Emoji
 
 from toolbox.logger import console
-from toolbox.utils import bytes_str, find, read_byte_content, write_byte_content
-from toolbox.binary import get_mask, split
+from toolbox.utils import bytes_str, read_byte_content, write_byte_content
+from toolbox.binary import get_mask
+
 
 
 Pos = Tuple[int, int, int]
@@ -59,24 +59,38 @@ class Header:
         return self.magic_bytes == MAGIC_BYTES
 
 
-def record_op(kind: Literal["read", "write"]) -> Callable[..., Any]:
-    def inner(func: Callable[..., Any]) -> Callable[..., Any]:
-        def wrapper(self: "Cursor", *args: Any, **kwargs: Any) -> Any:
-            count = find(args, lambda a: isinstance(a, (int, str, bytes))) or 0
-            if isinstance(count, (str, bytes)):
-                count = len(count)
-            start = self.seek(None)
-            res: Any = func(self, *args, **kwargs)
-            end = self.seek(None)
-            self.operations.append((start, end, count, kind))
-            return res
+MAGIC_BYTES = b"=)"
 
-        return wrapper
+# On-disk header layout, read and written as a single 14 byte record.
+HEADER_DTYPE = np.dtype(
+    [("magic", "V2"), ("count", ">u4"), ("checksum", "V4"), ("reserved", "V4")]
+)
 
-    return inner
+# Channel byte values used to format a container, by strategy name (random when None).
+_FORMAT_FILLS = {"fmt_zeros": 0x00, "fmt_ones": 0xFF, "random_bytes": None}
+# Number of color channels formatted at a time, bounds the random fill buffer.
+_FORMAT_CHUNK = 1 << 20
+# Number of recent operations each cursor keeps.
+_MAX_OPERATIONS = 1024
+# Minimum number of bytes for aligned reads and writes to use the parallel numba kernels.
+_PARALLEL_MIN_BYTES = 1 << 16
 
+# Note: the Numba kernels are imported on first use, importing Numba takes longer than most stego
+# commands so the ones that never reach a vectorized path shouldn't pay for it.
+_jit_kernels: Optional[ModuleType] = None
+_jit_loaded = False
 
-MAGIC_BYTES = b"=)"
+
+def _load_jit() -> Optional[ModuleType]:
+    global _jit_kernels, _jit_loaded
+    if not _jit_loaded:
+        try:
+            from toolbox.image import _stego_jit
+            _jit_kernels = _stego_jit
+        except ImportError:  # Numba is optional, fall back to the NumPy implementations.
+            _jit_kernels = None
+        _jit_loaded = True
+    return _jit_kernels
 
 
 class Cursor:
@@ -93,29 +107,45 @@ class Cursor:
         # into the individual color channels per image pixel. Larger LSB values allow for more
         # storage capacity, but further degrade the image quality.
         self.lsb = lsb
-        self.operations: List[Oper] = []
+        # Only the most recent operations are kept, has_write remembers if anything was written.
+        self.operations: Deque[Oper] = deque(maxlen=_MAX_OPERATIONS)
+        self.has_write = False
         self.pos: int = 0
         self.idx: int = 0
         self.lsb_mask = get_mask(lsb)
         self.msb_mask = get_mask(8 - lsb) << lsb
+        self.lsb_mask_u8 = np.uint8(self.lsb_mask & 0xFF)
+        self.msb_mask_u8 = np.uint8(self.msb_mask & 0xFF)
+        # Lookup tables indexed by a bit count in [0, lsb].
+        self._mask_table = [get_mask(n) for n in range(lsb + 1)]
+        self._msb_shift_table = [get_mask(n) << (lsb - n) for n in range(lsb + 1)]
+        self.msb_mask_table = np.array(self._msb_shift_table, dtype=np.uint8)
+        # Note: when lsb divides 8 every byte maps onto exactly 8 / lsb whole channels.
+        self.aligned = 8 % lsb == 0
+        self.byte_shifts = np.arange(8 - lsb, -1, -lsb, dtype=np.uint8)
+        # Note: for lsb 1 and 8 numpy's packbits and plain masking already beat the kernels.
+        self.parallel = lsb in (2, 4)
 
     @classmethod
     def read_header(cls, lsb: int, array: NDArray[np.uint8]) -> Tuple[Header, int]:
         cursor = Cursor(lsb)
-        header = Header()
-        header.magic_bytes = cursor.read(array, 2)
-        header.count = int.from_bytes(cursor.read(array, 4), "big")
-        header.checksum = cursor.read(array, 4)
-        header.reserved = cursor.read(array, 4)
+        record = np.frombuffer(cursor.read(array, HEADER_DTYPE.itemsize), dtype=HEADER_DTYPE)[0]
+        header = Header(
+            magic_bytes=record["magic"].tobytes(),
+            count=int(record["count"]),
+            checksum=record["checksum"].tobytes(),
+            reserved=record["reserved"].tobytes(),
+        )
         return header, cursor.pos
 
     def write_header(self, header: Header, array: NDArray[np.uint8]) -> None:
         cursor = Cursor(self.lsb)
-        cursor.write(array, MAGIC_BYTES[:2])
-        cursor.write(array, header.count.to_bytes(4, "big"))
-        cursor.write(array, header.checksum)
-        cursor.write(array, header.reserved)
+        record = np.array(
+            [(MAGIC_BYTES[:2], header.count, header.checksum, header.reserved)], dtype=HEADER_DTYPE
+        )
+        cursor.write(array, record.tobytes())
         self.operations += cursor.operations
+        self.has_write |= cursor.has_write
 
     def _get_bits(self) -> int:
         return self.lsb - ((self.pos * 8) % self.lsb)
@@ -127,6 +157,11 @@ class Cursor:
         bits = self.lsb - ((pos * 8) % self.lsb)
         return pos, idx, bits
 
+    def _seek_fast(self, pos: int) -> None:
+        # Same as seek, for internal callers that have no use for the position tuple.
+        self.pos = pos
+        self.idx = (pos * 8) // self.lsb
+
     def seek(self, pos: Union[int, None]) -> Pos:
         pos_ = self._seek(pos)
         self.pos, self.idx, _ = pos_
@@ -134,23 +169,24 @@ class Cursor:
 
     def next_byte(self, array: NDArray[np.uint8]) -> int:
         # Read a full byte from the array by concatenating the lsb bits from each array index.
-        _, buffer = split(array[self.idx], self._get_bits())
+        lsb, lsb_mask = self.lsb, self.lsb_mask
         bits = self._get_bits()
+        buffer = int(array[self.idx]) & self._mask_table[bits]
         while bits < 8:
             self.idx += 1
-            bits += self.lsb
-            buffer = buffer << self.lsb
-            buffer |= array[self.idx] & self.lsb_mask
+            bits += lsb
+            buffer = (buffer << lsb) | (int(array[self.idx]) & lsb_mask)
 
         bits -= 8
         self.pos += 1
         return buffer >> bits
 
     def get_msb_mask(self, n_bits: int) -> int:
-        n_bits = min(self.lsb, max(0, n_bits))
-        return get_mask(n_bits) << (self.lsb - n_bits)
+        return self._msb_shift_table[min(self.lsb, max(0, n_bits))]
 
-    def iter_bits(self, data: bytes, shift: int = 0) -> Iterator[Tuple[int, int]]:
+    def iter_bits(self, data: Union[bytes, memoryview], shift: int = 0) -> Iterator[Tuple[int, int]]:
+        lsb = self.lsb
+        masks, msb_masks = self._mask_table, self._msb_shift_table
         q = 0
         first_shift = shift
 
@@ -158,53 +194,123 @@ class Cursor:
             shift += 8
             q = (q << 8) + (byte & 0xFF)
 
-            while shift >= self.lsb:
-                shift -= self.lsb
-                v, q = split(q, shift)
-                yield v, self.get_msb_mask(first_shift)
-                first_shift -= self.lsb
+            while shift >= lsb:
+                shift -= lsb
+                yield q >> shift, msb_masks[min(lsb, max(0, first_shift))]
+                q &= (1 << shift) - 1
+                first_shift -= lsb
 
         if shift:
-            offset = self.lsb - shift
-            yield q << offset, get_mask(offset)
+            offset = lsb - shift
+            yield q << offset, masks[offset]
 
     def iter_bytes(self, array: NDArray[np.uint8], count: int) -> Iterator[bytes]:
+        lsb, lsb_mask = self.lsb, self.lsb_mask
         bits = self._get_bits()
         # Note: use uint16 here otherwise shifted bits will overflow.
-        q = np.uint16(array[self.idx] & get_mask(bits))
+        q = np.uint16(array[self.idx] & self._mask_table[bits])
         while count > 0:
             self.idx += 1
-            bits += self.lsb
-            q = np.uint16(q << self.lsb)
-            q |= array[self.idx] & self.lsb_mask
+            bits += lsb
+            q = np.uint16(q << lsb)
+            q |= array[self.idx] & lsb_mask
             if bits >= 8:
                 yield np.uint8(q >> (bits - 8)).tobytes()
                 count -= 1
                 self.pos += 1
                 bits -= 8
-        self.seek(self.pos)
+        self._seek_fast(self.pos)
+
+    def read_bytes_vectorized(self, array: NDArray[np.uint8], count: int) -> bytes:
+        # Equivalent to joining iter_bytes, but reassembles every byte in a single numpy pass.
+        if count <= 0:
+            return b""
+        start = self.pos * 8
+        if self.lsb == 8:
+            # Every channel is a whole payload byte.
+            data = array[self.idx : self.idx + count].tobytes()
+        elif self.lsb == 1:
+            data = np.packbits(array[self.idx : self.idx + count * 8] & 1).tobytes()
+        elif (
+            self.parallel
+            and count > _PARALLEL_MIN_BYTES
+            and self.idx + (count * 8) // self.lsb <= len(array)
+            and (kernels := _load_jit()) is not None
+        ):
+            data = kernels.unpack_lsb(array, self.lsb, count, self.idx).tobytes()
+        elif self.aligned:
+            channels = array[self.idx : self.idx + (count * 8) // self.lsb] & self.lsb_mask
+            chunks = channels.reshape(count, -1) << self.byte_shifts
+            data = np.bitwise_or.reduce(chunks, axis=1).tobytes()
+        else:
+            # Unpack the channels into a bit stream, keep only the lsb bits and repack them.
+            end = -(-(start + count * 8) // self.lsb)
+            bits = np.unpackbits(array[self.idx : end, None], axis=1)[:, 8 - self.lsb :]
+            offset = start % self.lsb
+            data = np.packbits(bits.reshape(-1)[offset : offset + count * 8]).tobytes()
+        self._seek_fast(self.pos + count)
+        return data
 
-    @record_op("read")
     def read(self, array: NDArray[np.uint8], count: int) -> bytes:
-        return b"".join(self.iter_bytes(array, count))
+        start = (self.pos, self.idx, self._get_bits())
+        res = self.read_bytes_vectorized(array, count)
+        self.operations.append((start, (self.pos, self.idx, self._get_bits()), count, "read"))
+        return res
 
-    @record_op("write")
-    def write(self, array: NDArray[np.uint8], data: bytes) -> None:
+    def write(self, array: NDArray[np.uint8], data: Union[bytes, memoryview]) -> None:
+        start = (self.pos, self.idx, self._get_bits())
+        if self.aligned:
+            self._write_aligned(array, data)
+        else:
+            self._write_unaligned(array, data)
+        self.operations.append((start, (self.pos, self.idx, self._get_bits()), len(data), "write"))
+        self.has_write = True
+
+    def _write_unaligned(self, array: NDArray[np.uint8], data: Union[bytes, memoryview]) -> None:
         shift = self.lsb - self._get_bits()
 
-        arr = np.array(list(self.iter_bits(data, shift=shift)), dtype=np.uint8)
+        kernels = _load_jit()
+        if kernels is not None:
+            arr = kernels.pack_bits(np.frombuffer(data, dtype=np.uint8), self.lsb, shift, self.msb_mask_table)
+        else:
+            arr = np.array(list(self.iter_bits(data, shift=shift)), dtype=np.uint8)
         if len(arr) <= 0:
             return
-        
-        bit_mask = np.uint8(0xFF & self.msb_mask)
-        arr[:, 1] |= bit_mask
-        
-        # Mask the existing bits.
-        array[self.idx : self.idx + len(arr)] &= bit_mask #arr[:, 1]
+
+        channels = array[self.idx : self.idx + len(arr)]
+        # Mask the existing bits, keeping the MSBs and the LSBs of the partially written first and
+        # last channels that fall outside of the data.
+        channels &= arr[:, 1] | self.msb_mask_u8
         # Write in the new LSB bits.
-        array[self.idx : self.idx + len(arr)] |= arr[:, 0]
-        
-        self.seek(self.pos + len(data))
+        channels |= arr[:, 0]
+
+        self._seek_fast(self.pos + len(data))
+
+    def _write_aligned(self, array: NDArray[np.uint8], data: Union[bytes, memoryview]) -> None:
+        # Slice every byte into its 8 / lsb chunks with a single broadcast shift.
+        src = np.frombuffer(data, dtype=np.uint8)
+        if self.lsb == 8:
+            # Every channel is a whole payload byte.
+            array[self.idx : self.idx + len(src)] = src
+            self._seek_fast(self.pos + len(src))
+            return
+        if (
+            self.parallel
+            and len(src) > _PARALLEL_MIN_BYTES
+            and self.idx + (len(src) * 8) // self.lsb <= len(array)
+            and (kernels := _load_jit()) is not None
+        ):
+            kernels.pack_lsb(src, self.lsb, array, self.idx)
+            self._seek_fast(self.pos + len(data))
+            return
+        if self.lsb == 1:
+            packed = np.unpackbits(src)
+        else:
+            packed = ((src[:, None] >> self.byte_shifts) & self.lsb_mask_u8).reshape(-1)
+        channels = array[self.idx : self.idx + len(packed)]
+        channels &= self.msb_mask_u8
+        channels |= packed
+        self._seek_fast(self.pos + len(data))
 
     def __str__(self) -> str:
         return f"<Cursor: lsb={self.lsb} idx={self.idx} pos={self.pos} bits={self._get_bits()} />"
@@ -225,26 +331,28 @@ class Container:
         self.data = self.img_to_array(self.img, remove_alpha=self.preserve_alpha)
         self.header, self.header_end = Cursor.read_header(self.lsb, self.data)
         self.cursor: Cursor = Cursor(lsb)
-        self.cursor.seek(self.header_end)
+        self.cursor._seek_fast(self.header_end)
+        # Payload digest, kept so saving does not have to unpack and hash the channels again.
+        self._checksum_cache: Optional[bytes] = None
 
     @staticmethod
     def img_to_array(img: Image.Image, remove_alpha: bool) -> NDArray[np.uint8]:
-        arr = np.asarray(img, dtype=np.uint8)
+        # Note: tobytes is already the flat HWC channel stream, frombuffer is read only so copy it once.
         if remove_alpha and Container.get_bit_depth(img) == 4:
-            # Remove the alpha channel.
-            arr = arr[:, :, :3]
-        return arr.flatten()
+            # Remove the alpha channel while packing the pixels.
+            raw = img.tobytes("raw", "RGB")
+        else:
+            raw = img.tobytes()
+        return np.frombuffer(raw, dtype=np.uint8).copy()
 
     def to_image(self) -> Image.Image:
-        shape = (self.size[1], self.size[0], 3)
-        arr = self.data.reshape(shape)
-        if self.preserve_alpha and self.get_bit_depth(self.img) == 4:
+        # Note: the channel array is already the flat HWC byte stream PIL expects, no reshape needed.
+        mode = "RGBA" if len(self.data) == self.size[0] * self.size[1] * 4 else "RGB"
+        img = Image.frombytes(mode, self.size, self.data)
+        if mode == "RGB" and self.get_bit_depth(self.img) == 4:
             # If alpha was ignored, load the alpha from the image.
-            orig = self.img_to_array(self.img, remove_alpha=False).reshape((self.size[1], self.size[0], 4))
-            # Write in only the RGB values.
-            orig[:, :, :3] = arr
-            arr = orig
-        return Image.fromarray(arr)
+            img.putalpha(self.img.getchannel("A"))
+        return img
 
     @staticmethod
     def get_bit_depth(img: Image.Image) -> int:
@@ -268,8 +376,7 @@ class Container:
         if initialize:
             container.initialize(force)
         yield container
-        write_op = find(container.cursor.operations, lambda o: o[3] == "write")
-        if write_op or initialize:
+        if container.cursor.has_write or initialize:
             container.save()
 
     def get_capacity(self) -> int:
@@ -298,9 +405,9 @@ class Container:
 
     def read_from(self, count: int, pos: int) -> bytes:
         curr_pos = self.cursor.pos
-        self.seek(pos)
+        self._seek_fast(pos)
         res = self.read(count)
-        self.seek(curr_pos)
+        self._seek_fast(curr_pos)
         return res
 
     def read(self, count: Optional[int] = None) -> bytes:
@@ -315,23 +422,27 @@ class Container:
             count = max_count
         return self.cursor.read(self.data, count)
 
-    def write_from(self, data: Union[str, bytes], pos: int) -> None:
+    def write_from(self, data: Union[str, bytes, bytearray, memoryview], pos: int) -> None:
         curr_pos = self.cursor.pos
-        self.seek(pos)
+        self._seek_fast(pos)
         self.write(data)
-        self.seek(curr_pos)
+        self._seek_fast(curr_pos)
 
-    def write(self, data: Union[str, bytes]) -> None:
+    def write(self, data: Union[str, bytes, bytearray, memoryview]) -> None:
         assert self.header.is_valid(), "Attempt to write to an invalid container"
         with console.status("Writing data to pixel channel LSBs..."):
-            if isinstance(data, str):
-                data = data.encode()
+            # Note: a flat byte view lets any buffer reach np.frombuffer and sha256 without a copy.
+            data = memoryview(data.encode() if isinstance(data, str) else data).cast("B")
+            # The written bytes are exactly the payload when they start at the header boundary.
+            at_start = self.cursor.pos == self.header_end
             self.cursor.write(self.data, data)
             self.header.count = len(data)
+            self._checksum_cache = sha256(data).digest()[:4] if at_start else None
 
     def calc_checksum(self) -> bytes:
-        chk = sha256(self.read_from(self.header.count, 0)).digest()[:4]
-        return chk
+        if self._checksum_cache is None:
+            self._checksum_cache = sha256(self.read_from(self.header.count, 0)).digest()[:4]
+        return self._checksum_cache
 
     def save(self, filename: Optional[str] = None) -> None:
         self.filename, _ = os.path.splitext(os.path.abspath(filename or self.filename))
@@ -350,11 +461,15 @@ class Container:
         pos = pos + self.header_end if pos is not None else None
         return self.cursor.seek(pos)
 
+    def _seek_fast(self, pos: int) -> None:
+        self.cursor._seek_fast(pos + self.header_end)
+
     def _initialize(self, force: bool = False) -> None:
         assert (
             force or not self.header.is_valid()
         ), f"{self.filename} is already a container, refusing to initialize"
 
+        self._checksum_cache = None
         self.header = Header(
             magic_bytes=MAGIC_BYTES,
             count=0,
@@ -372,16 +487,48 @@ class Container:
             console.log(f"[red]:x: Failed[/red] {e}")
 
     def format(self, strategy: Strategy) -> None:
-        self.seek(0)
+        self._seek_fast(0)
         strat = getattr(strategy, "__name__", "unknown")
         console.log(f"Formatting with strategy: [red]{strat}[/red]")
-        # TODO: optimize me
-        # Note, this can be severely optimized, per-byte container writing is slow, the values can
-        # instead be written directly into the color channel array with numpy.
-        # I haven't gotten around to it yet, and the loading bar is neat ¯\_(ツ)_/¯.
-        for _ in track(range(self.get_capacity()), description="Formatting..."):
-            self.cursor.write(self.data, next(strategy))
+        capacity = self.get_capacity()
+        if strat not in _FORMAT_FILLS:
+            # Unknown strategies can produce anything, write their bytes through the cursor.
+            data = b"".join(islice(strategy, capacity))[:capacity]
+            self.cursor.write(self.data, data)
+            self.header.count = 0
+            self._checksum_cache = None
+            return
+
+        # Known strategies only depend on the fill value, so the LSBs of every remaining channel
+        # are masked in directly.
+        fill = _FORMAT_FILLS[strat]
+        rng = np.random.default_rng()
+        start = self.cursor.seek(None)
+        lsb_mask = self.cursor.lsb_mask_u8
+        msb_mask = self.cursor.msb_mask_u8
+        _, idx, bits = start
+        if bits != self.lsb:
+            # The first channel still holds the last header bits above the free bits.
+            free_mask = get_mask(bits)
+            value = fill if fill is not None else int(rng.integers(0, 256))
+            self.data[idx] = (self.data[idx] & (~free_mask & 0xFF)) | (value & free_mask)
+            idx += 1
+
+        with console.status("Formatting pixel channel LSBs..."):
+            for chunk_start in range(idx, len(self.data), _FORMAT_CHUNK):
+                chunk = self.data[chunk_start : chunk_start + _FORMAT_CHUNK]
+                chunk &= msb_mask
+                if fill is None:
+                    chunk |= rng.integers(0, 256, len(chunk), dtype=np.uint8) & lsb_mask
+                else:
+                    chunk |= fill & lsb_mask
+
+        # Record the format as a single write covering the whole capacity.
+        end = self.cursor.seek(self.header_end + capacity)
+        self.cursor.operations.append((start, end, capacity, "write"))
+        self.cursor.has_write = True
         self.header.count = 0
+        self._checksum_cache = None
 
 
 def cat(file_path: str, out_file: str) -> None:
@@ -425,8 +572,9 @@ def info(file_path: str) -> None:
             Emoji("x", style="red")
             
         max_color_integrity = len(c.data) * 256
-        current_pos = c.cursor._seek(c.header.count)[1]
-        degredation = (get_mask(c.lsb) + 1) * current_pos
+        # Channel index of the end of the payload, no need for a full seek.
+        current_pos = (c.header.count * 8) // c.lsb
+        degredation = (c.cursor.lsb_mask + 1) * current_pos
         current_color_integrity = ((max_color_integrity - degredation) / max_color_integrity) * 100
         integrity_color = "green" if current_color_integrity > 99 else "red"
             
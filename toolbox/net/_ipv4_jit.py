@@ -0,0 +1,57 @@
+"""Numba kernels parsing dotted quad strings and matching addresses against subnets in bulk."""
+
+import numpy as np
+from numba import njit, prange
+
+
+@njit("int64(uint8[::1], int64[::1], uint32[::1])", cache=True, boundscheck=False, nogil=True)
+def parse_ipv4_bytes(buf, offsets, out):
+    """Parse the dotted quad strings packed into `buf` into `out`.
+
+    Address `i` spans `buf[offsets[i]:offsets[i + 1]]`.
+
+    Returns:
+        int: index of the first invalid address, or -1 if every address was parsed
+    """
+    for i in range(len(offsets) - 1):
+        acc = octet = overflow = dots = digits = 0
+        for j in range(offsets[i], offsets[i + 1]):
+            char = buf[j]
+            if char == 0x2E:  # '.'
+                if digits == 0:
+                    return i
+                acc = (acc << 8) | octet
+                overflow |= octet
+                octet = digits = 0
+                dots += 1
+                continue
+
+            digit = int(char) - 0x30  # '0'
+            if digit < 0 or digit > 9 or digits == 3:
+                return i
+            octet = octet * 10 + digit
+            digits += 1
+
+        if dots != 3 or digits == 0 or (overflow | octet) > 0xFF:
+            return i
+        out[i] = (acc << 8) | octet
+    return -1
+
+
+@njit(
+    "boolean[::1](uint32[::1], uint32[::1], uint32[::1])",
+    cache=True,
+    boundscheck=False,
+    nogil=True,
+    parallel=True,
+)
+def match_any_subnet(ips, masks, nets):
+    """Flag each address that belongs to any of the (mask, network) pairs."""
+    out = np.zeros(len(ips), dtype=np.bool_)
+    for i in prange(len(ips)):
+        ip = ips[i]
+        for j in range(len(masks)):
+            if ip & masks[j] == nets[j]:
+                out[i] = True
+                break
+    return out
@@ -1,14 +1,17 @@
 """IPv4 tools."""
 
-from functools import reduce
-from typing import Any, Dict, Optional, Union, List, cast
-import re
+from types import ModuleType, NotImplementedType
+from typing import Any, Callable, Dict, Iterable, Literal, Optional, Set, Union, List
+import json
 import numpy as np
+from numpy.typing import NDArray
+from rich.table import Table, Column
 
 from toolbox.binary import get_mask
+from toolbox.logger import console
 
 
-AddressLike = Union[int, str, np.uint32, "Address"]
+AddressLike = Union[int, np.integer, str, "Address"]
 
 private_subnets = [
     "10.0.0.0/8",
@@ -16,6 +19,30 @@ private_subnets = [
     "192.168.0.0/16",
 ]
 
+# Longest possible dotted quad string, ie. '255.255.255.255'.
+IPV4_STR_WIDTH = 15
+_IPV4_STR_DTYPE = np.dtype(f"S{IPV4_STR_WIDTH}")
+# Place value of a digit by its position from the end of its octet (index 0 is a non-digit).
+_DIGIT_WEIGHTS = np.array([0, 1, 10, 100], dtype=np.uint32)
+_OCTET_SHIFTS = np.array([24, 16, 8, 0], dtype=np.uint32)
+
+# Note: the Numba kernels are imported on first use, importing Numba takes longer than parsing a
+# single address so commands that never call them shouldn't pay for it.
+_jit_kernels: Optional[ModuleType] = None
+_jit_loaded = False
+
+
+def _load_jit() -> Optional[ModuleType]:
+    global _jit_kernels, _jit_loaded
+    if not _jit_loaded:
+        try:
+            from toolbox.net import _ipv4_jit
+            _jit_kernels = _ipv4_jit
+        except ImportError:  # Numba is optional, fall back to the NumPy implementations.
+            _jit_kernels = None
+        _jit_loaded = True
+    return _jit_kernels
+
 
 def is_valid(addr: AddressLike) -> bool:
     try:
@@ -25,14 +52,157 @@ def is_valid(addr: AddressLike) -> bool:
         return False
 
 
+def parse_many(addrs: Iterable[Union[str, bytes]]) -> NDArray[np.uint32]:
+    """Parse many IPv4 strings at once into an array of 32-bit integers.
+
+    Uses the compiled Numba kernel when Numba is installed. Otherwise each address is laid out as
+    a fixed width row of bytes so every digit, dot and octet is resolved with whole-array NumPy
+    operations rather than a Python loop per address.
+
+    Args:
+        addrs (Iterable[Union[str, bytes]]): dotted quad IPv4 strings
+
+    Raises:
+        ValueError: if any of the strings is not a valid IPv4 address
+
+    Returns:
+        NDArray[np.uint32]: the integer value of each address
+    """
+    kernels = _load_jit()
+    if kernels is not None:
+        return _parse_many_jit(addrs, kernels)
+    return _parse_many_numpy(addrs)
+
+
+def _parse_many_jit(addrs: Iterable[Union[str, bytes]], kernels: ModuleType) -> NDArray[np.uint32]:
+    items = [addr.encode() if isinstance(addr, str) else bytes(addr) for addr in addrs]
+    # Note: the compiled kernel needs a writable buffer, which `bytes` can't provide.
+    buf = np.frombuffer(bytearray(b"".join(items)), dtype=np.uint8)
+    offsets = np.zeros(len(items) + 1, dtype=np.int64)
+    np.cumsum([len(item) for item in items], out=offsets[1:])
+
+    out = np.empty(len(items), dtype=np.uint32)
+    invalid = kernels.parse_ipv4_bytes(buf, offsets, out)
+    if invalid >= 0:
+        raise ValueError(f"Invalid IPv4 string '{items[invalid].decode(errors='replace')}'")
+    return out
+
+
+def _parse_many_numpy(addrs: Iterable[Union[str, bytes]]) -> NDArray[np.uint32]:
+    items = list(addrs)
+    raw = np.asarray(items, dtype=np.bytes_).reshape(-1)
+    if not len(raw):
+        return np.empty(0, dtype=np.uint32)
+
+    # Note: bytes_ arrays drop trailing NUL bytes, which the other parsers reject as invalid.
+    lengths = np.fromiter(map(len, items), dtype=np.int64, count=len(items))
+    stripped = np.flatnonzero(np.char.str_len(raw) != lengths)
+    if len(stripped):
+        raise ValueError(f"Invalid IPv4 string {items[stripped[0]]!r}")
+
+    if raw.dtype.itemsize > IPV4_STR_WIDTH:
+        too_long = np.flatnonzero(np.char.str_len(raw) > IPV4_STR_WIDTH)
+        if len(too_long):
+            raise ValueError(f"Invalid IPv4 string '{raw[too_long[0]].item().decode()}'")
+
+    # One row of null padded bytes per address.
+    buf = raw.astype(_IPV4_STR_DTYPE).view(np.uint8).reshape(-1, IPV4_STR_WIDTH)
+    digits = buf - np.uint8(0x30)  # Bytes below '0' wrap around to large values.
+    is_digit = digits <= 9
+    is_dot = buf == 0x2E
+    is_pad = buf == 0
+
+    # Count the digits from each position to the end of its octet, walking right to left.
+    run = np.zeros((len(buf), IPV4_STR_WIDTH + 1), dtype=np.uint8)
+    for col in range(IPV4_STR_WIDTH - 1, -1, -1):
+        run[:, col] = np.where(is_digit[:, col], run[:, col + 1] + 1, 0)
+    run = run[:, :IPV4_STR_WIDTH]
+
+    # Every digit contributes its place value to the octet selected by the dots before it.
+    values = digits * _DIGIT_WEIGHTS[np.minimum(run, 3)]
+    octet_idx = np.cumsum(is_dot, axis=1)
+    octets = np.stack([np.where(octet_idx == i, values, 0).sum(axis=1) for i in range(4)], axis=1)
+
+    run_starts = is_digit & ~np.pad(is_digit, ((0, 0), (1, 0)))[:, :-1]
+    valid = (
+        (is_digit | is_dot | is_pad).all(axis=1)
+        # Padding may only trail the address.
+        & (is_pad == np.maximum.accumulate(is_pad, axis=1)).all(axis=1)
+        # Exactly four runs of digits separated by three dots, ie. no empty octets.
+        & (is_dot.sum(axis=1) == 3)
+        & (run_starts.sum(axis=1) == 4)
+        & (run <= 3).all(axis=1)
+        & (octets <= 0xFF).all(axis=1)
+    )
+    if not valid.all():
+        invalid: bytes = raw[np.flatnonzero(~valid)[0]].item()
+        raise ValueError(f"Invalid IPv4 string '{invalid.decode(errors='replace')}'")
+
+    return np.bitwise_or.reduce(octets.astype(np.uint32) << _OCTET_SHIFTS, axis=1).astype(np.uint32)
+
+
+def _parse_str(addr: str) -> int:
+    # Single pass over the raw bytes, shift-accumulating each octet as a '.' is reached.
+    # Any octet above 0xFF leaves bits set in `overflow` above the low byte.
+    acc = octet = overflow = dots = digits = 0
+    for char in addr.encode():
+        if char == 0x2E:  # '.'
+            if not digits:
+                raise ValueError(f"Invalid IPv4 string '{addr}'")
+            acc = (acc << 8) | octet
+            overflow |= octet
+            octet = digits = 0
+            dots += 1
+            continue
+
+        digit = char - 0x30  # '0'
+        if not 0 <= digit <= 9 or digits == 3:
+            raise ValueError(f"Invalid IPv4 string '{addr}'")
+        octet = octet * 10 + digit
+        digits += 1
+
+    if dots != 3 or not digits or (overflow | octet) & ~0xFF:
+        raise ValueError(f"Invalid IPv4 string '{addr}'")
+    return (acc << 8) | octet
+
+
+def _parse_int(addr: Union[int, np.integer]) -> int:
+    # NumPy integers are accepted too, ie. values from `parse_many`.
+    addr = int(addr)
+    if not 0 <= addr <= get_mask(32):
+        raise ValueError(f"Invalid IPv4 integer {addr}")
+    return addr
+
+
+def _parse_addr(addr: "Address") -> int:
+    return addr.integer
+
+
+def _match_subnets(
+    addrs: NDArray[np.uint32], masks: NDArray[np.uint32], networks: NDArray[np.uint32]
+) -> NDArray[np.bool_]:
+    addrs = np.ascontiguousarray(addrs, dtype=np.uint32)
+    kernels = _load_jit()
+    if kernels is not None:
+        return kernels.match_any_subnet(addrs, masks, networks)
+    # Broadcast every address against every mask / network pair.
+    return ((addrs[:, None] & masks[None, :]) == networks[None, :]).any(axis=1)
+
+
 class Address:
+    __slots__ = ("integer",)
+
     def __init__(self, addr: AddressLike) -> None:
         self.integer = self.parse(addr)
         
-    def __eq__(self, other: Any) -> bool:
+    def __eq__(self, other: object) -> Union[bool, NotImplementedType]:
+        # Note: isinstance checks the exact type before walking the MRO, Address and Subnet are cheap.
         if isinstance(other, Address):
             return self.integer == other.integer
-        return False
+        return NotImplemented
+    
+    def __hash__(self) -> int:
+        return hash(self.integer)
     
     def __or__(self, other: "Address") -> "Address":
         return Address(self.integer | other.integer)
@@ -41,45 +211,66 @@ class Address:
         return Address(self.integer & other.integer)
 
     @classmethod
-    def parse(cls, addr: AddressLike) -> np.uint32:
+    def parse(cls, addr: AddressLike) -> int:
+        handler = _PARSE_DISPATCH.get(type(addr))
+        if handler is not None:
+            return handler(addr)
+        # Subclasses and the other NumPy integer types miss the exact type lookup.
         if isinstance(addr, Address):
-            return addr.integer
-        
-        elif isinstance(addr, str):
-            match = re.match(r'^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$', addr)
-            if not match:
-                raise ValueError(f"Invalid IPv4 string '{addr}'")
-            
-            octets: List[int] = [int(match.group(i + 1)) << shift for i, shift in enumerate([24, 16, 8, 0])]
-            return np.uint32(reduce(lambda o1, o2: o1 | o2, octets, 0))
-        
-        elif isinstance(addr, int) and not 0 <= addr <= get_mask(32):
-            raise ValueError(f"Invalid IPv4 integer {addr}")
-        
-        return np.uint32(cast(int, addr))
+            return _parse_addr(addr)
+        if isinstance(addr, str):
+            return _parse_str(addr)
+        if isinstance(addr, (int, np.integer)):
+            return _parse_int(addr)
+        raise ValueError(f"Invalid IPv4 address {addr!r}")
+
+    @classmethod
+    def parse_many(cls, addrs: Iterable[Union[str, bytes]]) -> NDArray[np.uint32]:
+        return parse_many(addrs)
+
+    @classmethod
+    def contains_any(cls, addrs: NDArray[np.uint32], configs: Iterable["Config"]) -> NDArray[np.bool_]:
+        """Check many addresses against many networks at once.
+
+        Args:
+            addrs (NDArray[np.uint32]): integer addresses, ie. from `parse_many`
+            configs (Iterable[Config]): networks to check the addresses against
+
+        Returns:
+            NDArray[np.bool_]: True for each address within any of the networks
+        """
+        configs = list(configs)
+        masks = np.array([config.subnet.integer for config in configs], dtype=np.uint32)
+        networks = np.array([config.network_int for config in configs], dtype=np.uint32)
+        return _match_subnets(addrs, masks, networks)
+
+    @classmethod
+    def is_private_many(cls, addrs: NDArray[np.uint32]) -> NDArray[np.bool_]:
+        """Vectorized `is_private` for many integer addresses, ie. from `parse_many`."""
+        return _match_subnets(addrs, _PRIVATE_MASKS, _PRIVATE_NETWORKS)
         
     @property
     def octets(self) -> List[int]:
-        return [int((self.integer >> shift) & 0xFF) for shift in [24, 16, 8, 0]]
+        addr = self.integer
+        return [addr >> 24, (addr >> 16) & 0xFF, (addr >> 8) & 0xFF, addr & 0xFF]
     
     @property
     def is_private(self) -> bool:
-        for private_subnet in private_subnets:
-            if self in Config(private_subnet):
-                return True
-        return False
+        return _PRIVATE_SET.contains(self.integer)
         
     def __str__(self) -> str:
         return ".".join(map(str, self.octets))
     
     
 class Subnet(Address):
+    __slots__ = ()
+
     @classmethod
     def from_cidr(cls, cidr: int) -> "Subnet":
         if not 0 <= cidr <= 32:
             raise ValueError(f"Invalid IPv4 CIDR '{cidr}' must be between 0 and 32")
         
-        return Subnet(get_mask(cidr) << (32 - cidr))
+        return Subnet((0xFFFFFFFF << (32 - cidr)) & 0xFFFFFFFF)
     
     def get_network_address(self, addr: AddressLike) -> Address:
         return Address(addr) & self
@@ -89,10 +280,23 @@ class Subnet(Address):
     
     @property
     def wildcard_address(self) -> Address:
-        return Address(get_mask(32) - self.integer)
+        return Address(~self.integer & 0xFFFFFFFF)
     
 
+# Parsers keyed on the exact input type, see `Address.parse`.
+_PARSE_DISPATCH: Dict[type, Callable[[Any], int]] = {
+    str: _parse_str,
+    int: _parse_int,
+    np.uint32: _parse_int,
+    np.int64: _parse_int,
+    Address: _parse_addr,
+    Subnet: _parse_addr,
+}
+
+
 class Config:
+    __slots__ = ("address", "subnet", "_network_int", "_wildcard_int", "_broadcast_int")
+
     def __init__(self, addr: AddressLike, cidr: Optional[int]=None):
         if isinstance(addr, str):
             if "/" not in addr and cidr is None:
@@ -105,29 +309,45 @@ class Config:
             
         self.address = Address(addr)
         self.subnet = Subnet.from_cidr(cidr)
+        # The address and subnet never change, so compute the derived addresses once.
+        self._network_int = self.address.integer & self.subnet.integer
+        self._wildcard_int = 0xFFFFFFFF ^ self.subnet.integer
+        self._broadcast_int = self._network_int | self._wildcard_int
     
     def __contains__(self, addr: AddressLike) -> bool:
-        return self.subnet.get_network_address(addr) == self.network_address
+        # Addresses are already parsed, skip the parser dispatch for them.
+        value = addr.integer if type(addr) is Address else Address.parse(addr)
+        return (value & self.subnet.integer) == self._network_int
     
     @property
     def first_address(self) -> Address:
-        return Address(self.network_address.integer + 1)
+        return Address((self._network_int + 1) & 0xFFFFFFFF)
     
     @property
     def last_usable(self) -> Address:
-        return Address(self.broadcast_address.integer - 1)
+        return Address((self._broadcast_int - 1) & 0xFFFFFFFF)
         
     @property
     def network_address(self) -> Address:
-        return self.subnet.get_network_address(self.address)
+        return Address(self._network_int)
+
+    @property
+    def network_int(self) -> int:
+        """Integer network address, ie. for building NumPy lookups without an Address per network."""
+        return self._network_int
     
     @property
     def broadcast_address(self) -> Address:
-        return self.subnet.get_broadcast_address(self.address)
+        return Address(self._broadcast_int)
+    
+    @property
+    def wildcard_address(self) -> Address:
+        return Address(self._wildcard_int)
     
     @property
     def usable_addresses(self) -> int:
-        return int(self.broadcast_address.integer - self.network_address.integer - 1)
+        # /31 and /32 networks have no usable addresses.
+        return max(0, self._broadcast_int - self._network_int - 1)
     
     def to_json(self) -> Dict[str, Union[str, int, bool]]:
         return {
@@ -136,8 +356,73 @@ class Config:
             "network": str(self.network_address),
             "broadcast": str(self.broadcast_address),
             "usable_addresses": self.usable_addresses,
-            "wildcard_mask": str(self.subnet.wildcard_address),
+            "wildcard_mask": str(self.wildcard_address),
             "first_usable": str(self.first_address),
             "last_usable": str(self.last_usable),
             "private": self.address.is_private,
         }
+
+
+class SubnetSet:
+    """A set of networks that can be checked for an address with a single hash lookup per
+    distinct prefix length, rather than one mask comparison per network.
+
+    Network addresses are stored by prefix length with the host bits shifted out, so an address
+    is matched by shifting it by the same amount for each prefix length, longest first.
+    """
+
+    def __init__(self, subnets: Iterable[Union[str, Config]]) -> None:
+        self._prefixes: Dict[int, Set[int]] = {}
+        for subnet in subnets:
+            config = subnet if isinstance(subnet, Config) else Config(subnet)
+            cidr = bin(config.subnet.integer).count("1")
+            host_bits = 32 - cidr
+            self._prefixes.setdefault(host_bits, set()).add(config.network_int >> host_bits)
+        # Walk from the most specific (/32) to the least specific (/0) prefix.
+        self._host_bits = sorted(self._prefixes)
+
+    def contains(self, addr: AddressLike) -> bool:
+        addr = Address.parse(addr)
+        prefixes = self._prefixes
+        for host_bits in self._host_bits:
+            if (addr >> host_bits) in prefixes[host_bits]:
+                return True
+        return False
+
+    def __contains__(self, addr: AddressLike) -> bool:
+        return self.contains(addr)
+
+    def __len__(self) -> int:
+        return sum(len(networks) for networks in self._prefixes.values())
+
+
+# Private subnets never change, build the lookups once at import.
+_PRIVATE_SET = SubnetSet(private_subnets)
+_PRIVATE_CONFIGS = [Config(subnet) for subnet in private_subnets]
+_PRIVATE_MASKS = np.array([config.subnet.integer for config in _PRIVATE_CONFIGS], dtype=np.uint32)
+_PRIVATE_NETWORKS = np.array([config.network_int for config in _PRIVATE_CONFIGS], dtype=np.uint32)
+
+
+def show_ip(ip_address: str, output: Literal["print", "json"]) -> None:
+    """Print the network config of an IPv4 address in CIDR notation.
+
+    Args:
+        ip_address (str): IPv4 address in CIDR notation ie. 0.0.0.0/0
+        output (Literal["print", "json"]): print a table, or the raw JSON
+    """
+    data = Config(ip_address).to_json()
+    if output == "print":
+        table = Table(
+            Column("Key", style="#444444"),
+            Column("Value", style="cyan"),
+            border_style="#444444"
+        )
+        for key, val in data.items():
+            key = " ".join(key.capitalize().split("_"))
+            if isinstance(val, int):
+                table.add_row(key, f"{val:,}")
+            else:
+                table.add_row(key, str(val))
+        console.print(table)
+    else:
+        print(json.dumps(data, indent=4))
@@ -1,9 +1,11 @@
 from rich.text import Text
 from paramiko.ssh_exception import SSHException, AuthenticationException
+import atexit
 import getpass
 import os
 import stat
 from pathlib import Path
+from typing import Dict, Tuple
 from textual.widgets import DirectoryTree, Label
 from textual.widgets._directory_tree import DirEntry
 from textual.app import App, ComposeResult
@@ -12,6 +14,39 @@ import paramiko
 from toolbox.logger import console_err
 
 
+_S_IFMT = 0o170000  # File type bits of st_mode.
+_S_IFDIR = stat.S_IFDIR
+
+# SSH connections shared by every browser in the process, keyed on (hostname, username, port), so
+# re-opening a browser doesn't renegotiate the SSH handshake.
+_SSH_POOL: Dict[Tuple[str, str, int], paramiko.SSHClient] = {}
+
+
+def get_ssh_client(hostname: str, username: str, port: int) -> paramiko.SSHClient:
+    key = (hostname, username, port)
+    ssh = _SSH_POOL.get(key)
+    if ssh is not None:
+        transport = ssh.get_transport()
+        if transport is not None and transport.is_active():
+            return ssh
+        # The connection dropped, evict it and reconnect.
+        ssh.close()
+        del _SSH_POOL[key]
+
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    ssh.connect(hostname, username=username, allow_agent=True, port=port)
+    _SSH_POOL[key] = ssh
+    return ssh
+
+
+@atexit.register
+def close_ssh_clients() -> None:
+    while _SSH_POOL:
+        _, ssh = _SSH_POOL.popitem()
+        ssh.close()
+
+
 class SshFileBrowser(DirectoryTree):
     def __init__(
         self,
@@ -21,27 +56,23 @@ class SshFileBrowser(DirectoryTree):
         username: str,
         port: int,
     ) -> None:
-        self.ssh = paramiko.SSHClient()
-        self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.ssh.connect(hostname, username=username, allow_agent=True, port=port)
+        self.ssh = get_ssh_client(hostname, username, port)
         self.sftp = self.ssh.open_sftp()
         super().__init__(path)
 
     def on_unmount(self) -> None:
+        # Note: the SSH connection stays open in the pool for the next browser.
         self.sftp.close()
-        self.ssh.close()
 
     def _get_directory_entries(self, path: Path) -> list[DirEntry]:
-        entries: list[DirEntry] = []
-        for attr in self.sftp.listdir_attr(str(path)):
-            attr.filename
-            entries.append(
-                DirEntry(
-                    path=self.PATH(attr.filename),
-                    is_dir=stat.S_ISDIR(attr.st_mode) if attr.st_mode else False,
-                )
+        # Equivalent to stat.S_ISDIR, inlined since this runs for every remote file.
+        return [
+            DirEntry(
+                path=self.PATH(attr.filename),
+                is_dir=bool(attr.st_mode) and (attr.st_mode & _S_IFMT) == _S_IFDIR,
             )
-        return entries
+            for attr in self.sftp.listdir_attr(str(path))
+        ]
 
 
 class FileBrowserApp(App):
@@ -1,16 +1,18 @@
 import argparse
 import os
-from typing import Any
+from typing import Any, Literal
 
-from textual.app import App, ComposeResult
-from textual.widgets import Header, Footer
-from textual_imageview.viewer import ImageViewer
-from PIL import Image
+from toolbox.subcommands.loader import lazy, register
 
-from toolbox.subcommands.loader import register
-from toolbox.image.gif import extract_images_from_gif, write_gif_from_frames
-from toolbox.image.stego import initialize, validate, cat, write, fmt_ones, fmt_zeros, random_bytes, info
-from toolbox.image.scramble import main as scramble_main
+
+# Note: the image modules pull in PIL, NumPy and Textual, so they're only imported once a command
+# actually runs (see `lazy`). This keeps CLI startup (ie. '--help') fast.
+
+
+def stego_format(file_path: str, strategy: Literal["random", "zeros", "ones"]) -> None:
+    from toolbox.image import stego
+    strategies = {"random": stego.random_bytes, "zeros": stego.fmt_zeros, "ones": stego.fmt_ones}
+    stego.format(file_path, strategies[strategy]())
 
 
 @register("image", description="Image related utilities")
@@ -26,14 +28,14 @@ def setup_image_gif(parser: argparse.ArgumentParser) -> None:
     parser_extract = subparsers.add_parser("extract", help="Extract images from a Gif")
     parser_extract.add_argument("gif_file", help="Path to the .gif file")
     parser_extract.add_argument("--out-folder", default="out", help="Folder to save extracted frames to")
-    parser_extract.set_defaults(func=extract_images_from_gif)
+    parser_extract.set_defaults(func=lazy("toolbox.image.gif", "extract_images_from_gif"))
     
     # Images -> Gif.
     parser_build = subparsers.add_parser("build", help="Build a .gif from image frames")
     parser_build.add_argument("image_folder", help="Directory containing images to combine into a .gif")
     parser_build.add_argument("--out-file", default="./build.gif", help="Filename of the .gif to create")
     parser_build.add_argument("--duration", type=int, default=80, help="The amount of time (ms) for each frame")
-    parser_build.set_defaults(func=write_gif_from_frames)
+    parser_build.set_defaults(func=lazy("toolbox.image.gif", "write_gif_from_frames"))
 
 @register("image", "stego", description="Image based steganography tools")
 def setup_image_stego(parser: argparse.ArgumentParser) -> None:
@@ -45,34 +47,34 @@ def setup_image_stego(parser: argparse.ArgumentParser) -> None:
     )
     initialize_parser.add_argument("file_path", help="Image file to convert to a container")
     initialize_parser.add_argument("-f", "--force", action="store_true", help="Force re-initialize existing containers")
-    initialize_parser.set_defaults(func=initialize)
+    initialize_parser.set_defaults(func=lazy("toolbox.image.stego", "initialize"))
     
     validate_parser = subparsers.add_parser("validate", help="Validate the contents of a container")
     validate_parser.add_argument("file_path", help="Image file to validate")
     validate_parser.add_argument("--header-only", action="store_true", help="Only validate the contents of the header")
-    validate_parser.set_defaults(func=validate)
+    validate_parser.set_defaults(func=lazy("toolbox.image.stego", "validate"))
     
     cat_parser = subparsers.add_parser("cat", help="Dump the contents of an image container")
     cat_parser.add_argument("file_path", help="Image file container to read")
     cat_parser.add_argument("-o", "--out-file", default="-", help="Output file to write contents to, default stdout")
-    cat_parser.set_defaults(func=cat)
+    cat_parser.set_defaults(func=lazy("toolbox.image.stego", "cat"))
     
     write_parser = subparsers.add_parser("write", help="Write data into an existing container")
     write_parser.add_argument("file_path", help="Image file container to write to")
     write_parser.add_argument("--data", default="-", help="Data to write into the container, default reads from stdin")
-    write_parser.set_defaults(func=write)
+    write_parser.set_defaults(func=lazy("toolbox.image.stego", "write"))
     
     format_parser = subparsers.add_parser("format", help="Format the pixel channel LSBs, deleting all written data")
     format_parser.add_argument("file_path", help="Image file container to format")
     format_group = format_parser.add_mutually_exclusive_group()
-    format_group.add_argument("--random", action="store_const", const=random_bytes(), dest="strategy", help="Format the data with random bytes")
-    format_group.add_argument("--zeros", action="store_const", const=fmt_zeros(), dest="strategy", help="Format the data with all 0s")
-    format_group.add_argument("--ones", action="store_const", const=fmt_ones(), dest="strategy", help="Format the data with all 1s")
-    format_parser.set_defaults(func=format, strategy=random_bytes())
+    format_group.add_argument("--random", action="store_const", const="random", dest="strategy", help="Format the data with random bytes")
+    format_group.add_argument("--zeros", action="store_const", const="zeros", dest="strategy", help="Format the data with all 0s")
+    format_group.add_argument("--ones", action="store_const", const="ones", dest="strategy", help="Format the data with all 1s")
+    format_parser.set_defaults(func=stego_format, strategy="random")
     
     info_parser = subparsers.add_parser("info", help="Show container information")
     info_parser.add_argument("file_path", help="Image file container to inspect")
-    info_parser.set_defaults(func=info)
+    info_parser.set_defaults(func=lazy("toolbox.image.stego", "info"))
     
 
 @register("image", "scramble", description="Pixel scramble an image")
@@ -103,23 +105,27 @@ def setup_image_scramble(parser: argparse.ArgumentParser) -> None:
         default="PNG",
         help="Store the resulting file in this format",
     )
-    parser.set_defaults(func=scramble_main)
+    parser.set_defaults(func=lazy("toolbox.image.scramble", "main"))
 
 
 
 
-class CustomImageViewer(ImageViewer):
-    def __init__(self, image_file: str, *args: Any, **kwargs: Any) -> None:
-        super().__init__(Image.open(image_file), *args, **kwargs)
-        self.title = os.path.abspath(image_file)
-        
-    def compose(self) -> ComposeResult:
-        yield Header()
-        yield from super().compose()
-        yield Footer()
-        
-    
 def show_image(file_path: str) -> None:
+    from textual.app import App, ComposeResult
+    from textual.widgets import Header, Footer
+    from textual_imageview.viewer import ImageViewer
+    from PIL import Image
+
+    class CustomImageViewer(ImageViewer):
+        def __init__(self, image_file: str, *args: Any, **kwargs: Any) -> None:
+            super().__init__(Image.open(image_file), *args, **kwargs)
+            self.title = os.path.abspath(image_file)
+            
+        def compose(self) -> ComposeResult:
+            yield Header()
+            yield from super().compose()
+            yield Footer()
+
     class ImageViewerApp(App):
         def compose(self) -> ComposeResult:
             yield CustomImageViewer(file_path)
@@ -1,6 +1,7 @@
 """Register CLI subcommands on script startup."""
-from typing import Callable, Dict, List, Optional, TypeVar, TypedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, TypedDict
 from collections import defaultdict
+from importlib import import_module
 import argparse
 
 Func = Callable[[argparse.ArgumentParser], None]
@@ -48,6 +49,23 @@ def register(*subcommand: str, description: Optional[str]=None) -> Callable[[T],
     return wrapper
 
 
+def lazy(module: str, name: str) -> Callable[..., Any]:
+    """Create a subcommand handler that only imports its implementation once the subcommand runs.
+    The parsed CLI arguments are forwarded as keywords, so their `dest` names must match the
+    implementation's parameters.
+
+    Args:
+        module (str): module containing the implementation, ie. 'toolbox.image.gif'
+        name (str): function in the module to call
+
+    Returns:
+        Callable[..., Any]: handler to set as the parser's `func` default
+    """
+    def handler(**kwargs: Any) -> Any:
+        return getattr(import_module(module), name)(**kwargs)
+    return handler
+
+
 def init_subcommands(parser: argparse.ArgumentParser, reg: Optional[Dict[str, Registered]] = None) -> None:
     """Initialize all of the registered subcommand handlers. Inserting them into the main argparse
     argument parser config.
@@ -57,13 +75,16 @@ def init_subcommands(parser: argparse.ArgumentParser, reg: Optional[Dict[str, Re
     """
     if reg is None:
         reg = registered
-        
-    if not reg:
-        return
     
-    subparsers = parser.add_subparsers()
-    
-    for subcommand, child in reg.items():
-        sub_subparsers = subparsers.add_parser(subcommand, help=getattr(child["func"], "_description", None))
-        child["func"](sub_subparsers)
-        init_subcommands(sub_subparsers, child["children"])
+    # Walk the registry tree with an explicit stack, attaching each level's subparsers.
+    stack: List[Tuple[argparse.ArgumentParser, Dict[str, Registered]]] = [(parser, reg)]
+    while stack:
+        parent, children = stack.pop()
+        if not children:
+            continue
+        
+        subparsers = parent.add_subparsers()
+        for subcommand, child in children.items():
+            sub_parser = subparsers.add_parser(subcommand, help=getattr(child["func"], "_description", None))
+            child["func"](sub_parser)
+            stack.append((sub_parser, child["children"]))
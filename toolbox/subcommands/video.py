@@ -1,7 +1,17 @@
 import argparse
 
-from toolbox.subcommands.loader import register
-from toolbox.video.merge import merge_video_files
+from typing import Tuple
+
+from toolbox.subcommands.loader import lazy, register
+
+
+def parse_resolution(value: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT resolution string."""
+    try:
+        width, height = map(int, value.lower().split("x"))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"Invalid resolution {value}, expected WIDTHxHEIGHT") from e
+    return width, height
 
 
 @register("video", description="Video related utilities")
@@ -13,4 +23,26 @@ def setup_video(parser: argparse.ArgumentParser) -> None:
 def merge_video_files_cmd(parser: argparse.ArgumentParser) -> None:
     parser.add_argument("video_filenames", nargs="+", help="Video files to merge")
     parser.add_argument("--output-filename", default="output.mp4", help="The output filename for the merged video")
-    parser.set_defaults(func=merge_video_files)
+    parser.add_argument("--resolution", type=parse_resolution, help="Scale every video to WIDTHxHEIGHT, e.g. 1280x720")
+    parser.add_argument("--preset", help="Encoder preset used when the videos have to be re-encoded, defaults to the fastest")
+    parser.add_argument("--codec", help="Video encoder, defaults to the fastest usable H.264 encoder")
+    parser.add_argument("--audio-codec", help="Audio encoder, defaults to aac")
+    parser.add_argument("--threads", type=int, help="Encoder threads, defaults to the number of CPUs")
+    parser.add_argument("--bitrate", help="Target video bitrate, e.g. 5000k")
+    parser.add_argument(
+        "--method", choices=["chain", "compose"],
+        help="How clips are joined when re-encoding, defaults to chain if every clip has the same size and frame rate",
+    )
+    parser.add_argument(
+        "--copy-streams", action=argparse.BooleanOptionalAction, default=None,
+        help=(
+            "Join the videos without re-encoding, by default only when no encoder option is given "
+            "and every video has the same stream parameters"
+        ),
+    )
+    parser.add_argument(
+        "--parallel", action="store_true",
+        help="Re-encode each video in its own ffmpeg process, then join them without re-encoding",
+    )
+    # Note: moviepy is slow to import, only load it when a merge is requested.
+    parser.set_defaults(func=lazy("toolbox.video.merge", "merge_video_files"))
@@ -0,0 +1,70 @@
+import os
+import tempfile
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from toolbox.file import iter_files
+
+
+class TestFile(TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        # root/
+        #   a.txt
+        #   one/b.txt, one/two/c.txt, one/two/d.txt
+        #   three/e.txt
+        #   locked/f.txt
+        #   link -> one (directory symlink), link.txt -> a.txt (file symlink)
+        for path in ["a.txt", "one/b.txt", "one/two/c.txt", "one/two/d.txt", "three/e.txt", "locked/f.txt"]:
+            path = os.path.join(self.root, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            open(path, "w").close()
+        os.symlink(os.path.join(self.root, "one"), os.path.join(self.root, "link"))
+        os.symlink(os.path.join(self.root, "a.txt"), os.path.join(self.root, "link.txt"))
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def relative(self, files: List[str]) -> List[str]:
+        return [os.path.relpath(file, self.root) for file in files]
+
+    def test_iter_files(self) -> None:
+        files = self.relative(list(iter_files(self.root)))
+        # Directory symlinks aren't followed, file symlinks are listed as files.
+        self.assertCountEqual(files, [
+            "a.txt", "link.txt", "one/b.txt", "one/two/c.txt", "one/two/d.txt", "three/e.txt", "locked/f.txt",
+        ])
+
+    def test_iter_files_order(self) -> None:
+        """Depth first, a directory's files come before its sub directories and each sub tree is
+        listed in one run.
+        """
+        files = self.relative(list(iter_files(self.root)))
+        self.assertEqual(set(files[:2]), {"a.txt", "link.txt"})
+        for prefix in ["one/", "one/two/", "three/", "locked/"]:
+            indexes = [i for i, file in enumerate(files) if file.startswith(prefix)]
+            self.assertEqual(indexes, list(range(indexes[0], indexes[-1] + 1)), prefix)
+        self.assertLess(files.index("one/b.txt"), files.index("one/two/c.txt"))
+
+    def test_iter_files_unreadable(self) -> None:
+        """Directories that can't be listed are skipped, the rest of the walk carries on.
+        """
+        # Note: patch scandir rather than chmod, root can list any directory.
+        locked = os.path.join(self.root, "locked")
+        scandir = os.scandir
+
+        def fake_scandir(path: str) -> "os._ScandirIterator[str]":
+            if path == locked:
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        with patch("toolbox.file.os.scandir", side_effect=fake_scandir):
+            files = self.relative(list(iter_files(self.root)))
+        self.assertNotIn("locked/f.txt", files)
+        self.assertIn("three/e.txt", files)
+        self.assertEqual(len(files), 6)
+
+    def test_iter_files_missing(self) -> None:
+        self.assertEqual(list(iter_files(os.path.join(self.root, "missing"))), [])
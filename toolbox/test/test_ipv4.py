@@ -1,7 +1,8 @@
 
 from unittest import TestCase
+import numpy as np
 from toolbox.binary import get_mask
-from toolbox.net.ipv4 import Address, Config, is_valid
+from toolbox.net.ipv4 import Address, Config, SubnetSet, is_valid, parse_many, _parse_many_numpy
 
 
 class TestIPv4(TestCase):
@@ -21,17 +22,62 @@ class TestIPv4(TestCase):
         self.assertFalse(is_valid('255.255.255'))
         self.assertFalse(is_valid('1.1.1.-1'))
         self.assertFalse(is_valid('-1.1.1.1'))
+        self.assertFalse(is_valid('256.1.1.1'))
+        self.assertFalse(is_valid('1..1.1'))
+        self.assertFalse(is_valid('1.1.1.'))
+        self.assertFalse(is_valid('1.1.1.0001'))
+        self.assertFalse(is_valid('1.1.1.a'))
+        self.assertFalse(is_valid(''))
         
     def test_ipv4_address_integer(self) -> None:
         self.assertEqual(Address('0.0.0.0').integer, 0)
         self.assertEqual(Address('255.255.255.255').integer, get_mask(32))
         
+    def test_ipv4_parse_many(self) -> None:
+        addrs = ['0.0.0.0', '255.255.255.255', '192.168.1.1', '10.0.0.1', '1.22.133.4']
+        # The compiled (when Numba is installed) and NumPy implementations must agree.
+        for parse in [parse_many, _parse_many_numpy]:
+            self.assertListEqual(
+                [int(i) for i in parse(addrs)],
+                [Address.parse(addr) for addr in addrs],
+            )
+            self.assertEqual(len(parse([])), 0)
+            
+            for invalid in [
+                '1.1.1', '1..1.1', '1.1.1.1.', '256.0.0.0', '1.1.1.0001', '1.1.1.1234567890',
+                '1.1.1.1\x00', b'1.1.1.1\x00\x00', '1.1\x00.1.1',
+            ]:
+                with self.assertRaises(ValueError):
+                    parse(['1.1.1.1', invalid])
+                    
+    def test_ipv4_contains_any(self) -> None:
+        addrs = parse_many(['10.1.1.1', '8.8.8.8', '192.168.5.5', '172.32.0.1'])
+        configs = [Config('10.0.0.0/8'), Config('192.168.0.0/16')]
+        self.assertListEqual(Address.contains_any(addrs, configs).tolist(), [True, False, True, False])
+        
+    def test_ipv4_address_numpy_integers(self) -> None:
+        for dtype in [np.uint8, np.int32, np.uint32, np.int64, np.uint64]:
+            self.assertEqual(Address(dtype(5)).integer, 5)
+        self.assertEqual(Address(True).integer, 1)
+        self.assertEqual(Address(np.uint64(get_mask(32))).integer, get_mask(32))
+        with self.assertRaises(ValueError):
+            Address(np.uint64(get_mask(32) + 1))
+        with self.assertRaises(ValueError):
+            Address(np.int32(-1))
+
+    def test_ipv4_address_equality(self) -> None:
+        self.assertEqual(Address('10.0.0.1'), Address(167772161))
+        self.assertNotEqual(Address('10.0.0.1'), Address('10.0.0.2'))
+        self.assertNotEqual(Address('10.0.0.1'), '10.0.0.1')
+        self.assertEqual(len({Address('10.0.0.1'), Address(167772161)}), 1)
+        
     def test_ipv4_address_string(self) -> None:
         self.assertEqual(str(Address('1.1.1.1')), '1.1.1.1')
         
     def test_ipv4_network_config(self) -> None:
         config = Config('192.168.0.1/24')
         self.assertEqual(str(config.network_address), '192.168.0.0')
+        self.assertEqual(config.network_int, config.network_address.integer)
         self.assertEqual(str(config.broadcast_address), '192.168.0.255')
         self.assertEqual(config.usable_addresses, 254)
         self.assertTrue("192.168.0.123" in config)
@@ -45,4 +91,21 @@ class TestIPv4(TestCase):
         # Public IP addresses.
         self.assertFalse(Address('1.1.1.1').is_private)
         self.assertFalse(Address('192.169.1.1').is_private)
-        self.assertFalse(Address('172.15.255.255').is_private)
\ No newline at end of file
+        self.assertFalse(Address('172.15.255.255').is_private)
+        
+        addrs = ['192.168.1.1', '172.16.1.1', '10.0.0.1', '1.1.1.1', '192.169.1.1', '172.15.255.255']
+        self.assertListEqual(
+            Address.is_private_many(parse_many(addrs)).tolist(),
+            [Address(addr).is_private for addr in addrs],
+        )
+        
+    def test_subnet_set(self) -> None:
+        subnets = SubnetSet(['10.0.0.0/8', '10.1.2.0/24', Config('8.8.8.8/32'), '128.0.0.0/1'])
+        self.assertEqual(len(subnets), 4)
+        self.assertTrue('10.200.0.1' in subnets)
+        self.assertTrue('10.1.2.3' in subnets)
+        self.assertTrue('8.8.8.8' in subnets)
+        self.assertTrue('200.0.0.1' in subnets)
+        self.assertFalse('8.8.4.4' in subnets)
+        self.assertFalse('127.0.0.1' in subnets)
+        self.assertFalse(SubnetSet([]).contains('1.1.1.1'))
@@ -0,0 +1,143 @@
+"""Test cases for the video merge stream probing.
+"""
+
+import os
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from toolbox.video.merge import _parse_streams, can_stream_copy, merge_video_files
+
+
+# Captured `ffmpeg -hide_banner -i <file>` output.
+H264_AAC_320 = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'v1.mp4':
+  Metadata:
+    major_brand     : isom
+    minor_version   : 512
+    compatible_brands: isomiso2avc1mp41
+    encoder         : Lavf61.1.100
+  Duration: 00:00:02.00, start: 0.000000, bitrate: 127 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), 320x240 [SAR 1:1 DAR 4:3], 45 kb/s, 25 fps, 25 tbr, 12800 tbn (default)
+      Metadata:
+        handler_name    : VideoHandler
+        vendor_id       : [0][0][0][0]
+        encoder         : Lavc61.3.100 libx264
+  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), 44100 Hz, mono, fltp, 69 kb/s (default)
+      Metadata:
+        handler_name    : SoundHandler
+        vendor_id       : [0][0][0][0]
+At least one output file must be specified
+"""
+
+H264_AAC_160 = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'small.mp4':
+  Duration: 00:00:01.00, start: 0.000000, bitrate: 137 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), 160x120 [SAR 1:1 DAR 4:3], 47 kb/s, 30 fps, 30 tbr, 15360 tbn (default)
+  Stream #0:1[0x2](und): Audio: aac (LC) (mp4a / 0x6134706D), 44100 Hz, mono, fltp, 70 kb/s (default)
+At least one output file must be specified
+"""
+
+H264_SILENT_160 = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'silent.mp4':
+  Duration: 00:00:01.00, start: 0.000000, bitrate: 55 kb/s
+  Stream #0:0[0x1](und): Video: h264 (High) (avc1 / 0x31637661), yuv420p(progressive), 160x120 [SAR 1:1 DAR 4:3], 47 kb/s, 30 fps, 30 tbr, 15360 tbn (default)
+At least one output file must be specified
+"""
+
+MPEG4_MP3_320 = """\
+Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'other.mp4':
+  Duration: 00:00:02.00, start: 0.000000, bitrate: 407 kb/s
+  Stream #0:0[0x1](und): Video: mpeg4 (Simple Profile) (mp4v / 0x7634706D), yuv420p, 320x240 [SAR 1:1 DAR 4:3], 330 kb/s, 25 fps, 25 tbr, 12800 tbn (default)
+  Stream #0:1[0x2](und): Audio: mp3 (mp3float) (mp4a / 0x6134706D), 44100 Hz, mono, fltp, 64 kb/s (default)
+At least one output file must be specified
+"""
+
+MISSING = "missing.mp4: No such file or directory\n"
+
+
+class TestMerge(TestCase):
+    """Stream probing and copy decision test cases, without running ffmpeg.
+    """
+    def probe(
+        self,
+        outputs: Dict[str, str],
+        video_filenames: List[str],
+        resolution: Optional[Tuple[int, int]]=None,
+    ) -> bool:
+        """Run can_stream_copy with ffmpeg printing the captured output for each file.
+        """
+        def run(args: List[str], **_: Any) -> subprocess.CompletedProcess[str]:
+            return subprocess.CompletedProcess(args, 1, stdout="", stderr=outputs[args[-1]])
+
+        with patch("toolbox.video.merge.subprocess.run", side_effect=run):
+            return can_stream_copy(video_filenames, resolution)
+
+    def test_parse_streams(self) -> None:
+        self.assertEqual(
+            _parse_streams(H264_AAC_320),
+            (("Video", "h264", "yuv420p", "320x240", "25"), ("Audio", "aac", "44100", "mono")),
+        )
+        self.assertEqual(
+            _parse_streams(MPEG4_MP3_320),
+            (("Video", "mpeg4", "yuv420p", "320x240", "25"), ("Audio", "mp3", "44100", "mono")),
+        )
+        self.assertEqual(_parse_streams(H264_SILENT_160), (("Video", "h264", "yuv420p", "160x120", "30"),))
+
+    def test_parse_streams_unknown(self) -> None:
+        """Output without streams, or with streams the patterns can't describe, can't be copied.
+        """
+        self.assertIsNone(_parse_streams(MISSING))
+        self.assertIsNone(_parse_streams(""))
+        self.assertIsNone(_parse_streams("  Stream #0:0: Video: h264, 320x240\n"))
+
+    def test_parse_streams_frame_rate(self) -> None:
+        for fps in ["29.97", "1k"]:
+            streams = _parse_streams(H264_AAC_320.replace("25 fps", f"{fps} fps"))
+            assert streams is not None
+            self.assertEqual(streams[0][4], fps)
+
+    def test_can_stream_copy(self) -> None:
+        outputs = {
+            "a.mp4": H264_AAC_320,
+            "b.mp4": H264_AAC_320.replace("v1.mp4", "b.mp4"),
+            "small.mp4": H264_AAC_160,
+            "silent.mp4": H264_SILENT_160,
+            "other.mp4": MPEG4_MP3_320,
+            "missing.mp4": MISSING,
+        }
+        self.assertTrue(self.probe(outputs, ["a.mp4", "b.mp4", "a.mp4"]))
+        # Mismatched resolution, codecs, audio streams or an unreadable file.
+        self.assertFalse(self.probe(outputs, ["a.mp4", "small.mp4"]))
+        self.assertFalse(self.probe(outputs, ["a.mp4", "other.mp4"]))
+        self.assertFalse(self.probe(outputs, ["small.mp4", "silent.mp4"]))
+        self.assertFalse(self.probe(outputs, ["missing.mp4", "a.mp4"]))
+        self.assertFalse(self.probe(outputs, ["a.mp4", "missing.mp4"]))
+
+    def test_can_stream_copy_resolution(self) -> None:
+        outputs = {"a.mp4": H264_AAC_320, "b.mp4": H264_AAC_320}
+        self.assertTrue(self.probe(outputs, ["a.mp4", "b.mp4"], (320, 240)))
+        self.assertFalse(self.probe(outputs, ["a.mp4", "b.mp4"], (160, 120)))
+
+    def test_copy_streams_conflicts(self) -> None:
+        """An explicit stream copy can't be combined with options that need a re-encode.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            files = [os.path.join(tmp_dir, f"{i}.mp4") for i in range(2)]
+            for file in files:
+                open(file, "wb").close()
+            output = os.path.join(tmp_dir, "out.mp4")
+
+            options: List[Dict[str, Any]] = [
+                {"codec": "libx264"}, {"bitrate": "2M"}, {"resolution": (320, 240)}, {"parallel": True},
+            ]
+            for option in options:
+                with self.assertRaises(ValueError):
+                    merge_video_files(files, output, copy_streams=True, **option)
+
+            # An explicit copy that fails raises instead of re-encoding.
+            with patch("toolbox.video.merge._concat_stream_copy", return_value="boom"):
+                with self.assertRaises(ValueError):
+                    merge_video_files(files, output, copy_streams=True)
@@ -3,11 +3,12 @@
 """
 
 import os
-from unittest import TestCase
+from hashlib import sha256
+from unittest import TestCase, skipIf
 import numpy as np
 from PIL import Image
 
-from toolbox.image.stego import Cursor, Container
+from toolbox.image.stego import Cursor, Container, _load_jit
 from toolbox.binary import split, get_mask
 
 
@@ -20,6 +21,7 @@ class TestCursor(TestCase):
     def test_mask(self) -> None:
         self.assertEqual(get_mask(8), 0xFF)
         self.assertEqual(get_mask(3), 0b111)
+        self.assertEqual(get_mask(0), 0)
         
     def test_iter_bits(self) -> None:
         """Split bytes into bit chunks.
@@ -50,13 +52,69 @@ class TestCursor(TestCase):
             (0b010, 0),
         ])
         
+    @skipIf(_load_jit() is None, "numba is not installed")
+    def test_pack_bits(self) -> None:
+        """The compiled kernel yields the same chunks as iter_bits.
+        """
+        kernels = _load_jit()
+        assert kernels is not None
+        data = bytes(range(0, 256, 7))
+        for lsb in range(1, 9):
+            cursor = Cursor(lsb)
+            for shift in range(lsb):
+                expected = np.array(list(cursor.iter_bits(data, shift=shift)), dtype=np.uint8)
+                packed = kernels.pack_bits(
+                    np.frombuffer(data, dtype=np.uint8), lsb, shift, cursor.msb_mask_table
+                )
+                np.testing.assert_array_equal(packed, expected)
+
+    def test_read_bytes_vectorized(self) -> None:
+        """Vectorized reads match the byte at a time generator.
+        """
+        array = np.arange(256, dtype=np.uint8).repeat(2)
+        for lsb in range(1, 9):
+            for pos in range(5):
+                cursor = Cursor(lsb)
+                cursor.seek(pos)
+                expected = b"".join(cursor.iter_bytes(array, 16))
+                cursor.seek(pos)
+                self.assertEqual(cursor.read_bytes_vectorized(array, 16), expected)
+                self.assertEqual(cursor.pos, pos + 16)
+
+    def test_write_unaligned(self) -> None:
+        """Sequential writes that share a channel keep each other's bits.
+        """
+        array = np.arange(256, dtype=np.uint8)
+        msb = array & 0b11111000
+        cursor = Cursor(3)
+        for chunk in (b'a', b'bc', b'def'):
+            cursor.write(array, chunk)
+        cursor.seek(0)
+        self.assertEqual(cursor.read(array, 6), b'abcdef')
+        # Only the LSBs were touched.
+        np.testing.assert_array_equal(array & 0b11111000, msb)
+
+    def test_write_read_large(self) -> None:
+        """Large aligned transfers round trip through every code path.
+        """
+        data = np.random.default_rng(0).bytes(1 << 17)
+        for lsb in (1, 2, 4, 8):
+            array = np.full((len(data) * 8) // lsb, 0xA5, dtype=np.uint8)
+            cursor = Cursor(lsb)
+            cursor.write(array, data)
+            self.assertTrue(((array & cursor.msb_mask_u8) == (0xA5 & cursor.msb_mask_u8)).all())
+            cursor.seek(0)
+            self.assertEqual(cursor.read(array, len(data)), data)
+
     def test_split(self) -> None:
         """Split integers by a bit mask.
         """
         self.assertEqual(split(0xFF, 4), (0xF, 0xF))
         self.assertEqual(split(0xFF, 0), (0xFF, 0x0))
         self.assertEqual(split(0xFF, 8), (0x0, 0xFF))
-        self.assertEqual(split(0xFF, -1), (0xFF, 0x0))
+        self.assertEqual(split(0xFFFF, 12), (0xF, 0xFFF))
+        with self.assertRaises(ValueError):
+            split(0xFF, -1)
         
     def test_seek(self) -> None:
         self.assertEqual(self.cursor.seek(0), (0, 0, 3))
@@ -87,6 +145,13 @@ class TestContainer(TestCase):
         self.container.write_from('abcd'.encode(), 0)
         self.assertEqual(self.container.read_from(4, 0), 'abcd'.encode())
 
+    def test_container_checksum(self) -> None:
+        self.container.write_from(b'abcd', 0)
+        self.assertEqual(self.container.calc_checksum(), sha256(b'abcd').digest()[:4])
+        # Decoding the payload from the channels yields the same digest.
+        self.container._checksum_cache = None
+        self.assertEqual(self.container.calc_checksum(), sha256(b'abcd').digest()[:4])
+
 
 class TestImageIntegrity(TestCase):
     def setUp(self) -> None:
@@ -0,0 +1,77 @@
+import errno
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from toolbox.utils import _MAX_PATH, find, find_index, read_byte_content, write_byte_content
+
+
+class TestUtils(TestCase):
+    def test_find(self) -> None:
+        items = [1, 2, 3, 4]
+        # First match wins.
+        self.assertEqual(find(items, lambda x: x > 2), 3)
+        self.assertEqual(find(("", "", "a", "b"), bool), "a")
+        # Falsy matches are still returned, no match returns None.
+        self.assertEqual(find([1, 0, 2], lambda x: x == 0), 0)
+        self.assertIsNone(find(items, lambda x: x > 4))
+        self.assertIsNone(find([], lambda x: True))
+
+    def test_find_index(self) -> None:
+        items = [1, 2, 3, 2]
+        self.assertEqual(find_index(items, lambda x: x == 2), 1)
+        self.assertEqual(find_index(items, lambda x: x == 1), 0)
+        self.assertEqual(find_index(("", "", "a"), bool), 2)
+        # No match returns -1.
+        self.assertEqual(find_index(items, lambda x: x > 3), -1)
+        self.assertEqual(find_index([], lambda x: True), -1)
+
+    def test_read_byte_content_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "data.bin")
+            with open(file, "wb") as outfile:
+                outfile.write(b"\x00\xffdata")
+            self.assertEqual(read_byte_content(file), b"\x00\xffdata")
+
+    def test_read_byte_content_data(self) -> None:
+        """Strings that don't name a readable file are taken as the data itself.
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Missing file, directory and a path through a file.
+            missing = os.path.join(tmp_dir, "missing.bin")
+            self.assertEqual(read_byte_content(missing), missing.encode())
+            self.assertEqual(read_byte_content(tmp_dir), tmp_dir.encode())
+            file = os.path.join(tmp_dir, "data.bin")
+            open(file, "wb").close()
+            self.assertEqual(read_byte_content(os.path.join(file, "x")), os.path.join(file, "x").encode())
+
+        self.assertEqual(read_byte_content("hello world"), b"hello world")
+        # Longer than any path, or with a NUL byte, without calling open().
+        with patch("builtins.open") as mock_open:
+            data = "a" * (_MAX_PATH + 1)
+            self.assertEqual(read_byte_content(data), data.encode())
+            self.assertEqual(read_byte_content("a\x00b"), b"a\x00b")
+            mock_open.assert_not_called()
+        # A file name too long for the file system (ENAMETOOLONG), though short enough to try.
+        data = "a" * 300
+        self.assertEqual(read_byte_content(data), data.encode())
+
+    def test_read_byte_content_error(self) -> None:
+        with patch("builtins.open", side_effect=PermissionError(errno.EACCES, "Permission denied")):
+            with self.assertRaisesRegex(ValueError, "secret.bin"):
+                read_byte_content("secret.bin")
+
+    def test_write_byte_content(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file = os.path.join(tmp_dir, "out.bin")
+            write_byte_content(file, b"data")
+            with open(file, "rb") as infile:
+                self.assertEqual(infile.read(), b"data")
+            # Truncates an existing file.
+            write_byte_content(file, b"d")
+            with open(file, "rb") as infile:
+                self.assertEqual(infile.read(), b"d")
+
+            with self.assertRaisesRegex(ValueError, tmp_dir):
+                write_byte_content(tmp_dir, b"data")
@@ -2,47 +2,111 @@
 """
 
 from typing import TypeVar, Union, List, Tuple, Callable, Optional
+from functools import partial
+import errno
+import math
 import sys
 import os
 
 
 T = TypeVar("T")
 
-
-def find(array: Union[List[T], Tuple[T]], func: Callable[[T], bool]) -> Optional[T]:
+_STDIN_CHUNK = 1 << 20
+# Longest path open() can take, anything longer is data. Windows needs a \\?\ prefix to go past MAX_PATH.
+_MAX_PATH = 260 if sys.platform == "win32" else 4096
+# Errors from open() that mean the string isn't a usable path (Windows raises EINVAL for characters
+# like "?" or "*").
+_NOT_A_PATH_ERRNOS = (errno.ENAMETOOLONG, errno.EINVAL)
+
+_BYTES_SUFFIX = ("bytes", "kb", "mb", "gb", "tb", "pb")
+# (seconds, singular, plural), largest unit first.
+_TIME_UNITS = (
+    (3600 * 24 * 365, "year", "years"),
+    (3600 * 24 * 7, "week", "weeks"),
+    (3600 * 24, "day", "days"),
+    (3600, "hour", "hours"),
+    (60, "minute", "minutes"),
+    (1, "sec", "sec"),
+)
+
+
+def find(array: Union[List[T], Tuple[T, ...]], func: Callable[[T], bool]) -> Optional[T]:
     """Similar to JavaScripts Array.find, return an item in an array that matches a 
     filter function criteria.
 
     Args:
-        array (Union[List[T], Tuple[T]]): list of items to search
+        array (Union[List[T], Tuple[T, ...]]): list of items to search
         func (Callable[[T], bool]): lambda returning True for a successful match
 
     Returns:
         Optional[T]: item that matches the search function criteria
     """
-    for item in array:
-        if func(item):
-            return item
-    return None
+    return next(filter(func, array), None)
+
+
+def find_index(array: Union[List[T], Tuple[T, ...]], func: Callable[[T], bool]) -> int:
+    """Similar to JavaScripts Array.findIndex, return the index of the first item in an array
+    that matches a filter function criteria.
+
+    Args:
+        array (Union[List[T], Tuple[T, ...]]): list of items to search
+        func (Callable[[T], bool]): lambda returning True for a successful match
+
+    Returns:
+        int: index of the first matching item, -1 if no item matches
+    """
+    return next((i for i, item in enumerate(array) if func(item)), -1)
 
 
 def read_byte_content(file_or_data: str) -> bytes:
+    """Read the content of a file, stdin for "-", or take the string itself as the data when it
+    doesn't name a file.
+
+    Args:
+        file_or_data (str): file path, "-" or the data itself
+
+    Raises:
+        ValueError: the string names a file that can't be read
+
+    Returns:
+        bytes: file content or the encoded string
+    """
     if file_or_data == "-":
-        return sys.stdin.buffer.read()
-    if os.path.isfile(file_or_data):
+        # Read large pipes in fixed size chunks and join them once, rather than growing one buffer.
+        return b"".join(iter(partial(sys.stdin.buffer.read, _STDIN_CHUNK), b""))
+    # Note: open the path straight away rather than stat it first, anything that doesn't name a file
+    # is taken as the data itself. read() already sizes its buffer from the file size.
+    if len(file_or_data) > _MAX_PATH or "\x00" in file_or_data:
+        return file_or_data.encode()
+    try:
         with open(file_or_data, "rb") as infile:
             return infile.read()
-    return file_or_data.encode()
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return file_or_data.encode()
+    except OSError as e:
+        if e.errno not in _NOT_A_PATH_ERRNOS:
+            raise ValueError(f"Can't read {file_or_data} ({e.strerror})") from e
+        return file_or_data.encode()
 
 
 def write_byte_content(file: str, data: bytes) -> None:
-    if os.path.isfile(file):
+    """Write data to a file, created or truncated, or to stdout for "-".
+
+    Args:
+        file (str): file path or "-"
+        data (bytes): data to write
+
+    Raises:
+        ValueError: the file can't be written
+    """
+    if file == "-":
+        sys.stdout.buffer.write(data)
+        return
+    try:
         with open(file, "wb") as outfile:
             outfile.write(data)
-    elif file == "-":
-        sys.stdout.buffer.write(data)
-    else:
-        raise ValueError(f"Could not determine output file destination [{file}]")
+    except OSError as e:
+        raise ValueError(f"Can't write {file} ({e.strerror})") from e
 
 
 def bytes_str(num: float) -> str:
@@ -51,15 +115,13 @@ def bytes_str(num: float) -> str:
     :param int num: number to format
     :return str: formatted string
     """
-    suffix = ["bytes", "kb", "mb", "gb", "tb", "pb"]
-    idx = 0
-    while num > 1_024 and idx < len(suffix):
-        num /= 1_024
-        idx += 1
+    # Note: num > 1024 ** k exactly when ceil(num) - 1 has more than 10k bits, no division loop needed.
+    n = math.ceil(num)
+    idx = min(((n - 1).bit_length() - 1) // 10, len(_BYTES_SUFFIX) - 1) if n > 1_024 else 0
     if idx == 0:
         num = int(num)
-        return f"{num:,} {suffix[idx]}"
-    return f"{num:,.2f} {suffix[idx]}"
+        return f"{num:,} {_BYTES_SUFFIX[idx]}"
+    return f"{num / (1 << (idx * 10)):,.2f} {_BYTES_SUFFIX[idx]}"
 
 
 def time_delta_string(num: int) -> str:
@@ -68,18 +130,13 @@ def time_delta_string(num: int) -> str:
     :param int num: time delta in seconds
     :return str: formatted string
     """
-    times = {
-        3600 * 24 * 365: "year",
-        3600 * 24 * 7: "week",
-        3600 * 24: "day",
-        3600: "hour",
-        60: "minute",
-        1: "sec"
-    }
+    if num <= 0:
+        return ""
+    # Note: fractions of a second are never shown, integer divmod keeps the cascade exact.
+    num = int(num)
     string: List[str] = []
-    for val, key in times.items():
-        incr = int(num / val)
+    for val, single, plural in _TIME_UNITS:
+        incr, num = divmod(num, val)
         if incr > 0:
-            string.append(f"{incr:,} {key}{'s' if incr > 1 and key != 'sec' else ''}")
-            num -= (incr * val)
-    return f"{' '.join(string)}"
+            string.append(f"{incr:,} {plural if incr > 1 else single}")
+    return " ".join(string)
@@ -1,25 +1,441 @@
 import os
-from typing import List
-from moviepy import VideoFileClip, concatenate_videoclips
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, cast
+from moviepy import AudioFileClip, VideoFileClip, concatenate_videoclips
+from moviepy.config import FFMPEG_BINARY
 
-from toolbox.logger import console
+from toolbox.logger import console, console_err
 
 
 # Uses moviepy (https://github.com/Zulko/moviepy) to merge video clips into a single file.
+# When every clip shares the same stream parameters they are joined with the ffmpeg concat demuxer
+# instead, copying the encoded streams as is rather than decoding and re-encoding every frame.
 
+_STREAM_RE = re.compile(r"Stream #\d+:\d+.*?: (Video|Audio): (.*)")
+# codec, pixel format, size and frame rate.
+_VIDEO_RE = re.compile(r"^(\w+).*?, (\w+)(?:\([^)]*\))?, (\d+x\d+).*?, ([\d.]+k?) fps")
+# codec, sample rate and channel layout.
+_AUDIO_RE = re.compile(r"^(\w+).*?, (\d+) Hz, ([^,]+)")
 
-def merge_video_files(video_filenames: List[str], output_filename: str="merged.mp4"):
+# Hardware H.264 encoders in order of preference, libx264 is the fallback.
+# Note: h264_vaapi is left out, it needs a device and an upload filter the moviepy writer can't pass.
+_HW_H264_ENCODERS = ["h264_nvenc", "h264_qsv", "h264_videotoolbox"]
+# Default presets per encoder, a merge is not quality critical so favour speed.
+# Note: h264_videotoolbox has no presets, -preset is left out for encoders missing here when the
+# command line is ours (the moviepy writer always passes one).
+_ENCODER_PRESETS = {"h264_nvenc": "p4", "h264_qsv": "veryfast", "libx264": "ultrafast"}
+# Concurrent hardware encodes in a parallel merge, consumer NVENC cards allow only a few sessions.
+_HW_ENCODER_JOBS = 2
+
+# Fragmented MP4: the muxer writes each fragment as it is produced instead of holding the sample
+# tables until the end and rewriting the file, and the output is playable while it is written.
+_MOVFLAGS = "+frag_keyframe+empty_moov+default_base_moof"
+
+StreamInfo = Tuple[Tuple[str, ...], ...]
+
+
+def _probe_streams(filename: str) -> Optional[StreamInfo]:
+    """Describe the parameters of each stream that must match for the streams to be copied.
+
+    Args:
+        filename (str): video file to probe
+
+    Returns:
+        Optional[StreamInfo]: stream parameters, or None if they could not be determined
+    """
+    # Note: moviepy only ships the ffmpeg binary, parse its input summary instead of using ffprobe.
+    res = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-i", filename],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return _parse_streams(res.stderr)
+
+
+def _parse_streams(output: str) -> Optional[StreamInfo]:
+    # Pull the stream parameters out of the input summary ffmpeg -i prints to stderr.
+    streams: List[Tuple[str, ...]] = []
+    for kind, desc in _STREAM_RE.findall(output):
+        match = (_VIDEO_RE if kind == "Video" else _AUDIO_RE).match(desc)
+        if match is None:
+            return None
+        streams.append((kind, *match.groups()))
+    return tuple(streams) or None
+
+
+def can_stream_copy(video_filenames: List[str], resolution: Optional[Tuple[int, int]]=None) -> bool:
+    """Check if the video files can be concatenated without re-encoding.
+
+    Args:
+        video_filenames (List[str]): video files to merge
+        resolution (Optional[Tuple[int, int]]): required (width, height) of the output, if any
+
+    Returns:
+        bool: True if every file has the same, known, stream parameters
+    """
+    first = _probe_streams(video_filenames[0])
+    if first is None:
+        return False
+    if resolution is not None:
+        sizes = [s[3] for s in first if s[0] == "Video"]
+        if sizes != [f"{resolution[0]}x{resolution[1]}"]:
+            return False
+    return all(_probe_streams(f) == first for f in video_filenames[1:])
+
+
+def _concat_stream_copy(video_filenames: List[str], output_filename: str) -> Optional[str]:
+    # The concat demuxer reads the inputs from a list file, quote the paths in ffconcat syntax.
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as listing:
+        for file in video_filenames:
+            path = os.path.abspath(file).replace("'", "'\\''")
+            listing.write(f"file '{path}'\n")
+
+    try:
+        res = subprocess.run(
+            [
+                FFMPEG_BINARY, "-hide_banner", "-v", "error", "-y",
+                "-f", "concat", "-safe", "0", "-i", listing.name,
+                "-map", "0", "-c", "copy", "-movflags", _MOVFLAGS,
+                output_filename,
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+    finally:
+        os.remove(listing.name)
+
+    return None if res.returncode == 0 else res.stderr.strip()
+
+
+def _encoder_works(encoder: str) -> bool:
+    # An encoder can be compiled in without the hardware (or driver) being present, try it out.
+    try:
+        res = subprocess.run(
+            [
+                FFMPEG_BINARY, "-hide_banner", "-v", "error",
+                "-f", "lavfi", "-i", "color=size=256x256:duration=0.1",
+                "-c:v", encoder, "-f", "null", "-",
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=10,
+            check=False,
+        )
+    except subprocess.TimeoutExpired:
+        return False
+    return res.returncode == 0
+
+
+@lru_cache(maxsize=None)
+def detect_h264_encoder() -> str:
+    """Find the fastest usable H.264 encoder, preferring hardware encoders over libx264.
+
+    Returns:
+        str: ffmpeg encoder name
+    """
+    res = subprocess.run(
+        [FFMPEG_BINARY, "-hide_banner", "-encoders"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    available = set(re.findall(r"^\s*V\S*\s+(\S+)", res.stdout, re.MULTILINE))
+    for encoder in _HW_H264_ENCODERS:
+        if encoder in available and _encoder_works(encoder):
+            return encoder
+    return "libx264"
+
+
+def _transcode_part(
+    filename: str, part: str, video_filter: str, encoder_args: List[str], has_audio: bool
+) -> Optional[str]:
+    # Normalize one input to the shared output parameters so the parts can be stream copied.
+    # Note: without audio a silent track is generated, -shortest cuts it off at the end of the video.
+    audio_input: List[str] = [] if has_audio else ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo"]
+    audio_map: List[str] = ["-map", "0:a:0"] if has_audio else ["-map", "1:a:0", "-shortest"]
+    res = subprocess.run(
+        [
+            FFMPEG_BINARY, "-hide_banner", "-v", "error", "-y", "-i", filename, *audio_input,
+            "-map", "0:v:0", *audio_map, "-vf", video_filter, *encoder_args,
+            part,
+        ],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    return None if res.returncode == 0 else res.stderr.strip()
+
+
+def _parallel_merge(
+    video_filenames: List[str],
+    output_filename: str,
+    codec: str,
+    audio_codec: str,
+    preset: Optional[str],
+    bitrate: Optional[str],
+    threads: Optional[int],
+    resolution: Optional[Tuple[int, int]],
+) -> bool:
+    """Transcode every input in its own ffmpeg process, then stream copy the parts together.
+
+    Without a resolution the clips are centered on the largest canvas, like the compose method.
+
+    Returns:
+        bool: False if the inputs could not be probed or a transcode failed
+    """
+    probed = [_probe_streams(f) for f in video_filenames]
+    # Only inputs whose first stream is video are handled, anything else falls back to moviepy.
+    infos: List[StreamInfo] = [info for info in probed if info is not None and info[0][0] == "Video"]
+    if len(infos) != len(probed):
+        return False
+    sizes = [tuple(map(int, info[0][3].split("x"))) for info in infos]
+    fps = max(float(info[0][4].rstrip("k")) * (1000 if info[0][4].endswith("k") else 1) for info in infos)
+    has_audio = [any(s[0] == "Audio" for s in info) for info in infos]
+
+    if resolution is not None:
+        video_filter = f"scale={resolution[0]}:{resolution[1]}"
+    else:
+        # Note: yuv420p needs even dimensions.
+        width = max(w for w, _ in sizes)
+        height = max(h for _, h in sizes)
+        width, height = width + width % 2, height + height % 2
+        video_filter = f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2"
+    video_filter += f",fps={fps}"
+
+    # Split the CPUs between the ffmpeg processes rather than running one multithreaded encode per
+    # CPU, a hardware encoder only takes a few sessions at a time.
+    cpus = os.cpu_count() or 1
+    if codec in _HW_H264_ENCODERS:
+        workers = _HW_ENCODER_JOBS
+    elif threads:
+        workers = max(1, cpus // threads)
+    else:
+        workers = cpus
+    workers = min(workers, len(video_filenames))
+    threads = threads or max(1, cpus // workers)
+
+    encoder_args = ["-c:v", codec, "-threads", str(threads), "-pix_fmt", "yuv420p"]
+    if preset:
+        encoder_args += ["-preset", preset]
+    if bitrate:
+        encoder_args += ["-b:v", bitrate]
+    encoder_args += ["-c:a", audio_codec, "-ar", "44100", "-ac", "2"]
+
+    # Note: the work happens in the ffmpeg processes, threads are enough to keep them all running.
+    with tempfile.TemporaryDirectory() as tmp_dir, ThreadPoolExecutor(max_workers=workers) as executor:
+        parts = [os.path.join(tmp_dir, f"part{i}.mp4") for i in range(len(video_filenames))]
+        futures = [
+            executor.submit(_transcode_part, f, part, video_filter, encoder_args, audio)
+            for f, part, audio in zip(video_filenames, parts, has_audio)
+        ]
+        errors = [future.result() for future in futures]
+        failed = next((e for e in errors if e is not None), None)
+        if failed is not None:
+            console_err.log(f"Parallel transcode failed, re-encoding instead ({failed})")
+            return False
+        failed = _concat_stream_copy(parts, output_filename)
+        if failed is not None:
+            console_err.log(f"Joining the transcoded parts failed, re-encoding instead ({failed})")
+            return False
+        return True
+
+
+def _drop_page_cache(filename: str) -> None:
+    # The merged output is rarely read back right away, hint the kernel to write back and drop its
+    # pages instead of evicting the page cache of everything else.
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+class _SequentialDecoders:
+    """Keep the ffmpeg decoder processes of only one clip running at a time.
+
+    A merge reads its clips one after the other, so rather than holding a video and an audio decoder
+    open per clip for the whole write, each clip's decoders are stopped once it has been opened and
+    restarted on demand when its first frame is requested, stopping the previously active clip.
+    """
+
+    def __init__(self) -> None:
+        self.active: Optional[VideoFileClip] = None
+
+    @staticmethod
+    def audio(clip: VideoFileClip) -> Optional[AudioFileClip]:
+        # Note: moviepy initializes the attribute to None, which is all a type checker can infer.
+        return cast(Optional[AudioFileClip], clip.audio)
+
+    @classmethod
+    def close(cls, clip: VideoFileClip) -> None:
+        clip.reader.close()
+        audio = cls.audio(clip)
+        if audio is not None:
+            audio.reader.close()
+
+    def activate(self, clip: VideoFileClip) -> None:
+        if self.active is not clip:
+            if self.active is not None:
+                self.close(self.active)
+            self.active = clip
+
+    def open(self, filename: str, **kwargs: Any) -> VideoFileClip:
+        clip = VideoFileClip(filename, **kwargs)
+        self.close(clip)
+
+        video_frame = clip.frame_function
+        def frame_function(t: float) -> Any:
+            self.activate(clip)
+            if clip.reader.proc is None:
+                clip.reader.initialize(t)
+            return video_frame(t)
+        clip.frame_function = frame_function
+
+        audio = self.audio(clip)
+        if audio is not None:
+            audio_frame = audio.frame_function
+            reader = audio.reader
+            def audio_frame_function(t: Any) -> Any:
+                self.activate(clip)
+                if reader.proc is None:
+                    # Note: clips are read from the start, seeking forward from there is cheap. Drop the
+                    # stale buffer so the reader can't assume the new process continues from it.
+                    reader.buffer = None
+                    reader.initialize()
+                    reader.buffer_around(1)
+                return audio_frame(t)
+            audio.frame_function = audio_frame_function
+        return clip
+
+
+def merge_video_files(
+    video_filenames: List[str],
+    output_filename: str="merged.mp4",
+    *,
+    method: Optional[str]=None,
+    codec: Optional[str]=None,
+    audio_codec: Optional[str]=None,
+    preset: Optional[str]=None,
+    threads: Optional[int]=None,
+    bitrate: Optional[str]=None,
+    copy_streams: Optional[bool]=None,
+    resolution: Optional[Tuple[int, int]]=None,
+    parallel: bool=False,
+) -> None:
+    """Merge video files into a single file, copying the streams when possible.
+
+    Args:
+        video_filenames (List[str]): video files to merge, in order
+        output_filename (str): merged video file
+        method (Optional[str]): moviepy concatenation method, "chain" or "compose". Defaults to
+            "chain" when every clip has the same size and frame rate
+        codec (Optional[str]): video encoder, defaults to the fastest usable H.264 encoder
+        audio_codec (Optional[str]): audio encoder, defaults to aac
+        preset (Optional[str]): encoder preset, defaults to the fastest preset of the encoder
+        threads (Optional[int]): encoder threads, defaults to the number of CPUs
+        bitrate (Optional[str]): target video bitrate, ie: "5000k"
+        copy_streams (Optional[bool]): join the files without re-encoding. None copies the
+            streams only if no encoder option is given and every file has the same stream
+            parameters, True skips that check and False always re-encodes
+        resolution (Optional[Tuple[int, int]]): scale every video to (width, height)
+        parallel (bool): re-encode each file in its own ffmpeg process, then join them
+
+    Raises:
+        ValueError: if copy_streams is True and encoder options are given too, or the copy fails
+    """
     assert video_filenames, "No video files specified to merge"
     for file in video_filenames:
         assert os.path.isfile(file), f"File {file} does not exist"
 
+    encoder_options = {
+        "method": method,
+        "codec": codec,
+        "audio_codec": audio_codec,
+        "preset": preset,
+        "threads": threads,
+        "bitrate": bitrate,
+    }
+    explicit = [name for name, value in encoder_options.items() if value is not None]
+    if copy_streams:
+        # A copy never decodes the streams, so it can't honour any option that changes them.
+        conflicts = list(explicit)
+        if resolution is not None:
+            conflicts.append("resolution")
+        if parallel:
+            conflicts.append("parallel")
+        if conflicts:
+            raise ValueError(f"Can't copy the streams and also set {', '.join(conflicts)}")
+
     with console.status(f"Merging [green]{len(video_filenames)}[/green] video files...") as status:
-        clips = list(map(lambda f: VideoFileClip(f), video_filenames))
+        # Note: encoder options imply a re-encode, even when the streams could have been copied.
+        if copy_streams or (
+            copy_streams is None and not explicit and can_stream_copy(video_filenames, resolution)
+        ):
+            status.update(f"Copying streams into [green]{output_filename}[/green]...")
+            failed = _concat_stream_copy(video_filenames, output_filename)
+            if failed is None:
+                _drop_page_cache(output_filename)
+                return
+            if copy_streams:
+                raise ValueError(f"Stream copy failed ({failed})")
+            console_err.log(f"Stream copy failed, re-encoding instead ({failed})")
+
+        audio_codec = audio_codec or "aac"
+        codec = codec or detect_h264_encoder()
+        preset = preset or _ENCODER_PRESETS.get(codec)
+        if parallel:
+            status.update(f"Transcoding [green]{len(video_filenames)}[/green] video files ({codec})...")
+            if _parallel_merge(
+                video_filenames, output_filename, codec, audio_codec, preset, bitrate, threads, resolution
+            ):
+                _drop_page_cache(output_filename)
+                return
+
+        # Note: with a target resolution ffmpeg scales the frames while decoding, which is much faster
+        # than resizing them in Python afterwards.
+        # Note: a file listed more than once is opened once and its clip reused for every occurrence.
+        decoders = _SequentialDecoders()
+        unique = {f: decoders.open(f, target_resolution=resolution) for f in dict.fromkeys(video_filenames)}
+        clips = [unique[f] for f in video_filenames]
+
+        if method is None:
+            # Note: clips of the same size and frame rate can be played back to back, only mismatched
+            # clips need the (much slower) compositor.
+            uniform = len({(tuple(c.size), c.fps) for c in clips}) == 1
+            method = "chain" if uniform else "compose"
+        final_clip = concatenate_videoclips(clips, method=method)
+
+        threads = threads or os.cpu_count()
+        ffmpeg_params = ["-movflags", _MOVFLAGS]
+        if codec == "libx264":
+            # Note: x264 caps its frame threads by the frame height, slice threads keep every core busy
+            # on small frames too.
+            ffmpeg_params += ["-x264-params", f"sliced-threads=1:threads={threads}"]
 
-        final_clip = concatenate_videoclips(clips, method="compose")
-        
-        status.update(f"Writing [green]{output_filename}[/green]...")
-        final_clip.write_videofile(output_filename, codec="libx264", audio_codec="aac")
+        status.update(f"Writing [green]{output_filename}[/green] ({codec})...")
+        final_clip.write_videofile(
+            output_filename,
+            codec=codec,
+            audio_codec=audio_codec,
+            # Note: the moviepy writer always passes a preset, fall back to its own default.
+            preset=preset or "medium",
+            bitrate=bitrate,
+            threads=threads,
+            ffmpeg_params=ffmpeg_params,
+        )
 
-        for clip in clips:
+        for clip in unique.values():
             clip.close()
+        _drop_page_cache(output_filename)